@@ -11,11 +11,18 @@ from health_interpreter import HealthInterpreter
 from vector_store import VectorStore
 from ui_components import UIComponents
 
+@st.cache_resource
+def get_vector_store() -> VectorStore:
+    # Streamlit reruns the script on every interaction; sharing one store
+    # keeps its index and result cache alive across reruns. OCR'd text is
+    # highly redundant, so new documents are stored zlib-compressed
+    return VectorStore(compression='zlib')
+
 class HealthcareAssistant:
     def __init__(self):
         self.doc_processor = DocumentProcessor()
         self.health_interpreter = HealthInterpreter()
-        self.vector_store = VectorStore()
+        self.vector_store = get_vector_store()
         self.ui = UIComponents()
         
     def run(self):
@@ -230,32 +237,36 @@ class HealthcareAssistant:
         question = st.text_input("Ask a health-related question:")
         
         if question:
-            # Search relevant documents first
-            relevant_docs = self.vector_store.search_documents(question)
+            # Search relevant passages first
+            relevant_passages = self.vector_store.search_passages(question)
             
             # Generate answer
-            answer = self.health_interpreter.answer_question(question, relevant_docs)
+            answer = self.health_interpreter.answer_question(question, relevant_passages)
             
             st.subheader("💡 Answer")
             st.write(answer)
             
-            if relevant_docs:
+            if relevant_passages:
                 st.subheader("📚 Related Documents")
-                for doc in relevant_docs[:3]:
-                    st.write(f"• {doc['filename']}")
+                filenames = list(dict.fromkeys(passage['filename'] for passage in relevant_passages))
+                for filename in filenames[:3]:
+                    st.write(f"• {filename}")
     
     def document_library_page(self):
         st.header("📊 Document Library")
         
-        documents = self.vector_store.list_documents()
+        total_documents = self.vector_store.get_document_stats().get('total_documents', 0)
         
-        if documents:
-            st.write(f"**Total Documents:** {len(documents)}")
+        if total_documents:
+            st.write(f"**Total Documents:** {total_documents}")
+            
+            # Only the filename, date and a 200-character preview are read
+            documents = self.vector_store.iter_documents(columns=['filename'], preview_chars=200)
             
             for doc in documents:
                 with st.expander(f"📄 {doc['filename']}"):
                     st.write(f"**Added:** {doc.get('timestamp', 'Unknown')}")
-                    st.write(f"**Preview:** {doc.get('content', '')[:200]}...")
+                    st.write(f"**Preview:** {doc.get('preview', '')}...")
         else:
             st.info("No documents uploaded yet. Use the 'Upload & Analyze Documents' feature to get started.")
 
@@ -0,0 +1,112 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+from sklearn.feature_extraction.text import HashingVectorizer
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lsh_index import LSHIndex
+
+TERMS = [
+    "glucose", "cholesterol", "hdl", "ldl", "triglycerides", "hemoglobin", "platelets",
+    "creatinine", "insulin", "metformin", "lisinopril", "atorvastatin", "hypertension",
+    "diabetes", "kidney", "liver", "thyroid", "vitamin", "sodium", "potassium", "calcium",
+    "discharge", "admission", "prescription", "dosage", "tablet", "daily", "follow", "elevated",
+    "normal", "range", "patient", "provider", "blood", "pressure", "heart", "rate", "panel"
+]
+
+def generate_corpus(n_documents: int, words: int, seed: int):
+    """Generate synthetic documents, each drawing mostly from its own topic"""
+    rng = random.Random(seed)
+    vocabulary = TERMS + [f"term{i}" for i in range(5000)]
+    documents = []
+    for _ in range(n_documents):
+        topic = rng.sample(vocabulary, 40)
+        documents.append(" ".join(
+            rng.choice(topic) if rng.random() < 0.7 else rng.choice(vocabulary) for _ in range(words)
+        ))
+    return documents
+
+def generate_queries(documents, n_queries: int, query_words: int, seed: int):
+    """Sample short keyword queries from random documents"""
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(rng.choice(documents).split(), query_words)) for _ in range(n_queries)]
+
+def benchmark(matrix, query_matrix, n_tables: int, n_bits: int, top_k: int, min_score: float):
+    """Measure recall@k, candidate fraction and latency of the tables and of posting-list search
+    
+    Posting-list search is what VectorStore's hashing scorer runs; it is
+    exact, so its recall shows it agrees with the full scan.
+    """
+    index = LSHIndex(n_tables=n_tables, n_bits=n_bits)
+    
+    start = time.perf_counter()
+    index.add_many(list(range(matrix.shape[0])), matrix)
+    build_seconds = time.perf_counter() - start
+    
+    hits = search_hits = expected_total = 0
+    candidates = 0
+    exact_seconds = approximate_seconds = search_seconds = 0.0
+    for row in range(query_matrix.shape[0]):
+        query = query_matrix[row]
+        
+        start = time.perf_counter()
+        expected, _ = index.exact_query(query, top_k, min_score)
+        exact_seconds += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        found, _ = index.query(query, top_k, min_score)
+        approximate_seconds += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        searched, _ = index.search(query, top_k, min_score)
+        search_seconds += time.perf_counter() - start
+        
+        hits += len(set(expected) & set(found))
+        search_hits += len(set(expected) & set(searched))
+        expected_total += len(expected)
+        candidates += len(index.candidates(query))
+    
+    n_queries = query_matrix.shape[0]
+    return {
+        'recall': hits / max(expected_total, 1),
+        'search_recall': search_hits / max(expected_total, 1),
+        'candidate_fraction': candidates / (n_queries * matrix.shape[0]),
+        'build_seconds': build_seconds,
+        'exact_ms': 1000 * exact_seconds / n_queries,
+        'approximate_ms': 1000 * approximate_seconds / n_queries,
+        'search_ms': 1000 * search_seconds / n_queries
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Report LSH recall against the exact cosine path")
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--words', type=int, default=120)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--query-words', type=int, default=8)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--min-score', type=float, default=0.1, help="similarity threshold used by VectorStore")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    # Same configuration as VectorStore's hashing scorer
+    vectorizer = HashingVectorizer(n_features=2 ** 18, stop_words='english', ngram_range=(1, 2), alternate_sign=False)
+    documents = generate_corpus(args.documents, args.words, args.seed)
+    matrix = vectorizer.transform(documents)
+    query_matrix = vectorizer.transform(generate_queries(documents, args.queries, args.query_words, args.seed + 1))
+    
+    print(f"{args.documents} documents, {args.queries} queries of {args.query_words} words, recall@{args.top_k} above {args.min_score}")
+    print(f"{'tables':>6} {'bits':>4} {'recall':>7} {'scanned':>8} {'build s':>8} {'exact ms':>9} {'lsh ms':>7} "
+          f"{'search recall':>13} {'search ms':>9}")
+    for n_tables, n_bits in ((8, 12), (16, 10), (16, 8), (32, 8), (32, 6)):
+        result = benchmark(matrix, query_matrix, n_tables, n_bits, args.top_k, args.min_score)
+        print(f"{n_tables:>6} {n_bits:>4} {result['recall']:>7.3f} {result['candidate_fraction']:>8.2%} "
+              f"{result['build_seconds']:>8.2f} {result['exact_ms']:>9.2f} {result['approximate_ms']:>7.2f} "
+              f"{result['search_recall']:>13.3f} {result['search_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from benchmark_lsh_recall import generate_corpus, generate_queries
+from lsh_index import LSHIndex
+from vector_codec import PRECISIONS, encode_rows, decode_rows
+
+def encode_json(matrix):
+    """The JSON text rows VectorStore stored before binary vectors"""
+    return [
+        json.dumps({'indices': row.indices.tolist(), 'weights': row.data.tolist()}).encode('utf-8')
+        for row in matrix
+    ]
+
+def rank(matrix, query_matrix, top_k: int, min_score: float):
+    """Exact top-k document ids and scores per query"""
+    scores = (query_matrix @ matrix.T).toarray()
+    ranked = []
+    for row in scores:
+        order = np.argsort(-row, kind='stable')[:top_k]
+        order = order[row[order] >= min_score]
+        ranked.append((order, row[order]))
+    return ranked
+
+def agreement(reference, ranked):
+    """Share of reference top-k ids kept, and the largest score difference on those ids"""
+    hits = expected = 0
+    max_error = 0.0
+    for (expected_ids, expected_scores), (found_ids, found_scores) in zip(reference, ranked):
+        found = dict(zip(found_ids.tolist(), found_scores.tolist()))
+        hits += sum(1 for document_id in expected_ids.tolist() if document_id in found)
+        expected += len(expected_ids)
+        for document_id, score in zip(expected_ids.tolist(), expected_scores.tolist()):
+            if document_id in found:
+                max_error = max(max_error, abs(found[document_id] - score))
+    return hits / max(expected, 1), max_error
+
+def lsh_weight_bytes(matrix, weight_dtype) -> int:
+    """Bytes of indices and weights an LSH index keeps in memory for the rows, posting lists included"""
+    index = LSHIndex(n_tables=0, weight_dtype=weight_dtype)
+    index.add_many(list(range(matrix.shape[0])), matrix)
+    postings = 0 if index._postings is None else index._postings.doc_positions.nbytes + index._postings.weights.nbytes
+    return postings + sum(entry[0].nbytes + entry[1].nbytes for entry in index.vectors.values())
+
+def benchmark(name: str, matrix, query_matrix, top_k: int, min_score: float):
+    """Print storage size, LSH memory and top-k agreement of every stored format"""
+    reference = rank(matrix, query_matrix, top_k, min_score)
+    legacy_bytes = sum(map(len, encode_json(matrix)))
+    
+    print(f"\n{name}: {matrix.shape[0]} rows, {matrix.nnz / matrix.shape[0]:.0f} weights per row")
+    print(f"{'format':>8} {'stored MB':>10} {'vs json':>8} {'lsh MB':>10} {'recall@k':>9} {'max error':>10}")
+    print(f"{'json':>8} {legacy_bytes / 2 ** 20:>10.2f} {1:>8.2f} {lsh_weight_bytes(matrix, np.float64) / 2 ** 20:>10.2f} "
+          f"{1:>9.3f} {0:>10.2e}")
+    
+    for precision in PRECISIONS:
+        encoded = encode_rows(matrix, precision)
+        stored_bytes = sum(map(len, encoded))
+        
+        # VectorStore keeps hashed weights as float16 unless float32 is stored; int8
+        # is only a storage format, so its in-memory size equals float16's
+        weight_dtype = np.float32 if precision == 'float32' else np.float16
+        decoded = decode_rows(encoded, matrix.shape[1], weight_dtype).astype(np.float32)
+        recall, max_error = agreement(reference, rank(decoded, query_matrix, top_k, min_score))
+        
+        print(f"{precision:>8} {stored_bytes / 2 ** 20:>10.2f} {stored_bytes / legacy_bytes:>8.2f} "
+              f"{lsh_weight_bytes(decoded, weight_dtype) / 2 ** 20:>10.2f} {recall:>9.3f} {max_error:>10.2e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report stored vector size and ranking agreement per precision")
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=120)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--query-words', type=int, default=8)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--min-score', type=float, default=0.1, help="similarity threshold used by VectorStore")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    documents = generate_corpus(args.documents, args.words, args.seed)
+    queries = generate_queries(documents, args.queries, args.query_words, args.seed + 1)
+    print(f"{args.documents} documents, {args.queries} queries of {args.query_words} words, "
+          f"top-{args.top_k} agreement with full precision above {args.min_score}")
+    
+    # Same configurations as VectorStore's hashing and TF-IDF vectors
+    hashing = HashingVectorizer(n_features=2 ** 18, stop_words='english', ngram_range=(1, 2), alternate_sign=False)
+    benchmark("hashed vectors", hashing.transform(documents), hashing.transform(queries), args.top_k, args.min_score)
+    
+    tfidf = TfidfVectorizer(max_features=1000, stop_words='english', ngram_range=(1, 2))
+    matrix = tfidf.fit_transform(documents)
+    benchmark("TF-IDF vectors", matrix, tfidf.transform(queries), args.top_k, args.min_score)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from vector_store import VectorStore
+from document_processor import DocumentProcessor
+
+class AsyncVectorStore:
+    """Awaitable facade over VectorStore and DocumentProcessor for asyncio services
+    
+    Blocking calls run on dedicated bounded executors, one per resource type,
+    so the event loop never waits on SQLite, sklearn or Tesseract:
+    
+    - writes: a single thread, so inserts, deletes and index updates are serialized
+    - reads: up to search_workers threads, each with its own SQLite connection
+    - OCR: up to ocr_workers threads, each driving one Tesseract process
+    """
+    
+    def __init__(self, store: VectorStore = None, processor: DocumentProcessor = None,
+                 search_workers: int = 4, ocr_workers: int = 2, **store_kwargs):
+        self.store = store or VectorStore(**store_kwargs)
+        self.processor = processor or DocumentProcessor()
+        self.logger = logging.getLogger(__name__)
+        
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='store-write')
+        self._read_executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix='store-read')
+        self._ocr_executor = ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix='ocr')
+    
+    async def _run(self, executor: ThreadPoolExecutor, function, *args, **kwargs):
+        """Run a blocking call on an executor without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(function, *args, **kwargs))
+    
+    async def add_document(self, filename: str, content: str, document_type: str = None,
+                           metadata: Dict = None) -> Optional[int]:
+        """Add a document on the serialized write executor"""
+        return await self._run(self._write_executor, self.store.add_document, filename, content,
+                               document_type, metadata)
+    
+    async def add_documents(self, documents: Iterable[Dict], batch_size: int = 500, reindex: str = 'end') -> Dict:
+        """Bulk-add documents on the serialized write executor"""
+        return await self._run(self._write_executor, self.store.add_documents, list(documents),
+                               batch_size=batch_size, reindex=reindex)
+    
+    async def delete_document(self, document_id: int) -> bool:
+        """Delete a document on the serialized write executor"""
+        return await self._run(self._write_executor, self.store.delete_document, document_id)
+    
+    async def search_documents(self, query: str, top_k: int = 5, **filters) -> List[Dict]:
+        """Search documents on the parallel read executor"""
+        return await self._run(self._read_executor, self.store.search_documents, query, top_k, **filters)
+    
+    async def search_passages(self, query: str, top_k: int = 5, **filters) -> List[Dict]:
+        """Search passages on the parallel read executor"""
+        return await self._run(self._read_executor, self.store.search_passages, query, top_k, **filters)
+    
+    async def get_document(self, document_id: int) -> Dict:
+        """Get a document on the parallel read executor"""
+        return await self._run(self._read_executor, self.store.get_document, document_id)
+    
+    async def similar_documents(self, document_id: int, k: int = 5) -> List[Dict]:
+        """Get similar documents on the parallel read executor"""
+        return await self._run(self._read_executor, self.store.similar_documents, document_id, k)
+    
+    async def extract_text(self, file_path: str) -> Optional[str]:
+        """Extract text from a PDF or image on the capped OCR executor"""
+        return await self._run(self._ocr_executor, self.processor.extract_text, file_path)
+    
+    async def ingest_file(self, file_path: str, filename: str = None, document_type: str = None,
+                          metadata: Dict = None) -> Optional[int]:
+        """Extract a file's text and store it, holding each executor only for its own step"""
+        text = await self.extract_text(file_path)
+        if not text:
+            self.logger.warning(f"No text extracted from {file_path}")
+            return None
+        
+        return await self.add_document(filename or file_path, text, document_type, metadata)
+    
+    async def close(self):
+        """Wait for queued work, then close the store"""
+        for executor in (self._ocr_executor, self._read_executor, self._write_executor):
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+        self.store.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
@@ -0,0 +1,101 @@
+import numpy as np
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+class BM25Index:
+    """Incrementally maintained Okapi BM25 index over tokenized documents"""
+    
+    def __init__(self, analyzer: Callable[[str], List[str]], k1: float = 1.5, b: float = 0.75):
+        self.analyzer = analyzer
+        self.k1 = k1
+        self.b = b
+        
+        # term -> {document_id: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        
+        # term -> (document ids, term frequencies, document lengths), rebuilt lazily
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+    
+    def add(self, document_id: int, text: str):
+        """Index a document; costs O(length of the document)"""
+        if document_id in self.doc_lengths:
+            self.remove(document_id)
+        
+        terms = Counter(self.analyzer(text))
+        length = sum(terms.values())
+        
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[document_id] = frequency
+            self._arrays.pop(term, None)
+        
+        self.doc_lengths[document_id] = length
+        self.total_length += length
+    
+    def remove(self, document_id: int, text: str = None):
+        """Remove a document, using its text to find its postings when available"""
+        if document_id not in self.doc_lengths:
+            return
+        
+        terms = set(self.analyzer(text)) if text is not None else list(self.postings)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None and posting.pop(document_id, None) is not None:
+                self._arrays.pop(term, None)
+                if not posting:
+                    del self.postings[term]
+        
+        self.total_length -= self.doc_lengths.pop(document_id)
+    
+    def search(self, query: str, top_k: int = 5, candidates: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Score documents containing query terms, returning ids and scores best first
+        
+        With candidates, only those document ids are scored; idf still uses
+        document frequencies over the whole index.
+        """
+        n_documents = len(self.doc_lengths)
+        terms = [term for term in set(self.analyzer(query)) if term in self.postings]
+        
+        if top_k <= 0 or n_documents == 0 or not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        
+        average_length = self.total_length / n_documents
+        
+        doc_ids = []
+        contributions = []
+        for term in terms:
+            ids, frequencies, lengths = self._term_arrays(term)
+            idf = np.log(1.0 + (n_documents - len(ids) + 0.5) / (len(ids) + 0.5))
+            if candidates is not None:
+                keep = np.isin(ids, candidates)
+                ids, frequencies, lengths = ids[keep], frequencies[keep], lengths[keep]
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / average_length)
+            doc_ids.append(ids)
+            contributions.append(idf * frequencies * (self.k1 + 1.0) / (frequencies + norm))
+        
+        matched, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions), minlength=len(matched))
+        
+        if len(scores) > top_k:
+            selected = np.argpartition(-scores, top_k - 1)[:top_k]
+            matched, scores = matched[selected], scores[selected]
+        
+        order = np.lexsort((matched, -scores))
+        return matched[order], scores[order]
+    
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get the posting list of a term as NumPy arrays"""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings[term]
+            arrays = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float64, count=len(posting)),
+                np.fromiter((self.doc_lengths[doc_id] for doc_id in posting), dtype=np.float64, count=len(posting))
+            )
+            self._arrays[term] = arrays
+        return arrays
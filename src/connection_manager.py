@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+import logging
+from typing import Callable, Dict, Iterable, Tuple
+
+class ConnectionManager:
+    """Per-thread persistent SQLite connections tuned for concurrent readers"""
+    
+    # Applied to every new connection
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),        # readers no longer block on writers
+        ('synchronous', 'NORMAL'),      # durable at checkpoints, safe with WAL
+        ('cache_size', -16000),         # 16 MB page cache per connection
+        ('mmap_size', 268435456),       # serve reads from a 256 MB memory map
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 5000)          # wait up to 5 s for a competing writer
+    )
+    
+    def __init__(self, db_path: str, cached_statements: int = 256,
+                 functions: Iterable[Tuple[str, int, Callable]] = (), read_only: bool = False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.cached_statements = cached_statements
+        self.functions = tuple(functions)
+        self.logger = logging.getLogger(__name__)
+        
+        # thread ident -> (owning thread, connection)
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use
+        
+        The connection can be used as a context manager to commit or roll
+        back a transaction, like a plain sqlite3 connection.
+        """
+        thread = threading.current_thread()
+        entry = self._connections.get(thread.ident)
+        if entry is not None and entry[0] is thread:
+            return entry[1]
+        
+        conn = self._connect()
+        with self._lock:
+            self._close_dead_threads()
+            self._connections[thread.ident] = (thread, conn)
+        return conn
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and tune a new connection"""
+        # Each connection is only used by the thread that opened it; the
+        # check is relaxed so close() can run from any thread
+        conn = sqlite3.connect(self.db_path, cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        for name, value in self.PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.read_only:
+            conn.execute("PRAGMA query_only = ON")
+        for name, n_args, function in self.functions:
+            conn.create_function(name, n_args, function, deterministic=True)
+        return conn
+    
+    def _close_dead_threads(self):
+        """Close connections whose owning thread has exited"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                del self._connections[ident]
+                conn.close()
+    
+    def close(self):
+        """Close all connections"""
+        with self._lock:
+            for _, conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    self.logger.warning(f"Error closing connection: {str(e)}")
+            self._connections.clear()
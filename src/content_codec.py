@@ -0,0 +1,87 @@
+import codecs
+import lzma
+import zlib
+from typing import Iterator, Optional, Union
+
+# Codecs for documents.content; 'none' rows hold plain TEXT, the others a compressed BLOB
+CODECS = ('none', 'zlib', 'lzma')
+
+# Decompressed bytes produced per step when only a prefix of the content is needed
+CHUNK_SIZE = 16384
+
+def compress_content(text: str, codec: str) -> Union[str, bytes]:
+    """Encode content for storage with the given codec"""
+    if codec == 'none':
+        return text
+    if codec == 'zlib':
+        return zlib.compress(text.encode('utf-8'), 6)
+    if codec == 'lzma':
+        return lzma.compress(text.encode('utf-8'), preset=6)
+    raise ValueError(f"Unknown content codec '{codec}', expected one of {CODECS}")
+
+def decompress_content(value: Union[str, bytes, None], codec: Optional[str]) -> Optional[str]:
+    """Decode stored content in full"""
+    if value is None or codec in (None, 'none'):
+        return value
+    if codec == 'zlib':
+        return zlib.decompress(value).decode('utf-8')
+    if codec == 'lzma':
+        return lzma.decompress(value).decode('utf-8')
+    raise ValueError(f"Unknown content codec '{codec}'")
+
+def _iter_decompressed(value: bytes, codec: str) -> Iterator[bytes]:
+    """Decompress in bounded steps so callers can stop early"""
+    if codec == 'zlib':
+        decompressor = zlib.decompressobj()
+        data = value
+        while data:
+            yield decompressor.decompress(data, CHUNK_SIZE)
+            data = decompressor.unconsumed_tail
+        yield decompressor.flush()
+    elif codec == 'lzma':
+        decompressor = lzma.LZMADecompressor()
+        data = value
+        while not decompressor.eof:
+            chunk = decompressor.decompress(data, CHUNK_SIZE)
+            data = b''
+            if not chunk and decompressor.needs_input:
+                break
+            yield chunk
+    else:
+        raise ValueError(f"Unknown content codec '{codec}'")
+
+def content_substr(value: Union[str, bytes, None], codec: Optional[str], start: int, length: int) -> Optional[str]:
+    """SQLite substr() over stored content, decompressing only up to the end of the slice"""
+    if value is None or codec in (None, 'none'):
+        return None if value is None else value[start - 1:start - 1 + length]
+    
+    end = start - 1 + length
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    decoded = 0
+    for chunk in _iter_decompressed(value, codec):
+        part = decoder.decode(chunk)
+        parts.append(part)
+        decoded += len(part)
+        if decoded >= end:
+            break
+    
+    return ''.join(parts)[start - 1:end]
+
+def content_sql(table: str = None) -> str:
+    """SQL expression for the full text of a documents row"""
+    prefix = f"{table}." if table else ''
+    return (f"CASE {prefix}content_codec WHEN 'none' THEN {prefix}content "
+            f"ELSE decompress_content({prefix}content, {prefix}content_codec) END")
+
+def content_substr_sql(table: str, start: str, length: str) -> str:
+    """SQL expression for a slice of a documents row's text; plain rows use the built-in substr()"""
+    prefix = f"{table}." if table else ''
+    return (f"CASE {prefix}content_codec WHEN 'none' THEN substr({prefix}content, {start}, {length}) "
+            f"ELSE content_substr({prefix}content, {prefix}content_codec, {start}, {length}) END")
+
+# Registered on every connection, as (name, number of arguments, function)
+SQL_FUNCTIONS = (
+    ('decompress_content', 2, decompress_content),
+    ('content_substr', 4, content_substr)
+)
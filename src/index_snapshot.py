@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import logging
+from typing import Dict, Optional
+import numpy as np
+
+# Bump when the on-disk layout changes; older snapshots are then rebuilt
+SNAPSHOT_VERSION = 2
+
+ARRAYS = (
+    'idf', 'doc_ids',
+    'data', 'indices', 'indptr',
+    'postings_weights', 'postings_positions', 'postings_indptr', 'max_weights',
+    'passage_ids', 'passage_document_ids',
+    'passage_postings_weights', 'passage_postings_positions', 'passage_postings_indptr', 'passage_max_weights'
+)
+
+logger = logging.getLogger(__name__)
+
+def save_snapshot(directory: str, fingerprint: str, vocabulary: Dict[str, int], arrays: Dict[str, np.ndarray]):
+    """Write a versioned index snapshot and atomically make it the current one"""
+    os.makedirs(directory, exist_ok=True)
+    
+    # Each snapshot lives in its own folder so readers holding memory maps
+    # of the previous one are never affected by the write; the name leads
+    # with a generation so concurrent writers agree on which one is newer
+    generation = time.time_ns()
+    name = f"snapshot-{generation:020d}-{uuid.uuid4().hex}"
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    
+    for key in ARRAYS:
+        np.save(os.path.join(path, f"{key}.npy"), np.ascontiguousarray(arrays[key]))
+    
+    # The vocabulary is written last and marks the snapshot as complete
+    with open(os.path.join(path, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f)
+    
+    # A newer snapshot published while this one was being written wins
+    current = _current_manifest(directory)
+    if current and _generation(current.get('path', '')) > generation:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    
+    manifest = {'version': SNAPSHOT_VERSION, 'fingerprint': fingerprint, 'path': name}
+    temp_manifest = os.path.join(directory, f"CURRENT.{name}.tmp")
+    with open(temp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temp_manifest, os.path.join(directory, 'CURRENT'))
+    
+    # Remove complete snapshots this one supersedes; newer ones and ones
+    # another writer is still filling in are left alone
+    for entry in os.listdir(directory):
+        entry_path = os.path.join(directory, entry)
+        if (entry.startswith('snapshot-') and _generation(entry) < generation
+                and os.path.exists(os.path.join(entry_path, 'vocabulary.json'))):
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+def _generation(name: str) -> int:
+    """Generation a snapshot folder was created at, or 0 when it has none"""
+    try:
+        return int(name.split('-')[1])
+    except (IndexError, ValueError):
+        return 0
+
+def _current_manifest(directory: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directory, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_snapshot(directory: str, fingerprint: str) -> Optional[Dict]:
+    """Memory-map the current snapshot if it matches the given fingerprint"""
+    manifest = _current_manifest(directory)
+    if manifest is None:
+        return None
+    
+    if manifest.get('version') != SNAPSHOT_VERSION or manifest.get('fingerprint') != fingerprint:
+        return None
+    
+    path = os.path.join(directory, manifest['path'])
+    try:
+        snapshot = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode='r') for key in ARRAYS}
+        
+        with open(os.path.join(path, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+            snapshot['vocabulary'] = json.load(f)
+        
+        return snapshot
+        
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable index snapshot {path}: {str(e)}")
+        return None
@@ -0,0 +1,116 @@
+import numpy as np
+from typing import Tuple
+from scipy import sparse
+
+def select_top_k(positions: np.ndarray, scores: np.ndarray, top_k: int,
+                 min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Partially select the top-k scores above min_score, best first"""
+    above = scores > min_score
+    positions, scores = positions[above], scores[above]
+    if len(scores) > top_k:
+        selected = np.argpartition(-scores, top_k - 1)[:top_k]
+        positions, scores = positions[selected], scores[selected]
+    
+    # Ties are broken by position so results are deterministic
+    order = np.lexsort((positions, -scores))
+    return positions[order].astype(np.int64), scores[order]
+
+class InvertedIndex:
+    """Term -> posting list index over a fitted document-term matrix"""
+    
+    def __init__(self, matrix):
+        # Posting lists are the columns of the document-term matrix
+        term_matrix = sparse.csc_matrix(matrix)
+        term_matrix.sort_indices()
+        
+        self.n_documents = term_matrix.shape[0]
+        self.indptr = term_matrix.indptr
+        self.doc_positions = term_matrix.indices
+        self.weights = term_matrix.data
+        
+        # Highest weight in each posting list, used as the per-term score bound
+        self.max_weights = np.zeros(term_matrix.shape[1])
+        lengths = np.diff(self.indptr)
+        non_empty = lengths > 0
+        if self.weights.size:
+            self.max_weights[non_empty] = np.maximum.reduceat(self.weights, self.indptr[:-1][non_empty])
+    
+    @classmethod
+    def from_arrays(cls, n_documents: int, indptr: np.ndarray, doc_positions: np.ndarray,
+                    weights: np.ndarray, max_weights: np.ndarray) -> 'InvertedIndex':
+        """Wrap existing posting arrays, e.g. memory-mapped ones, without copying"""
+        index = cls.__new__(cls)
+        index.n_documents = n_documents
+        index.indptr = indptr
+        index.doc_positions = doc_positions
+        index.weights = weights
+        index.max_weights = max_weights
+        return index
+    
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the document positions and weights for a term"""
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.doc_positions[start:end], self.weights[start:end]
+    
+    def search(self, query_terms: np.ndarray, query_weights: np.ndarray, top_k: int = 5,
+               min_score: float = 0.0, allowed: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Score documents sharing a term with the query using MaxScore pruning
+        
+        Returns document positions and scores above min_score, best first.
+        An optional boolean mask over positions restricts scoring to allowed
+        documents; the others are dropped from the postings before scoring.
+        """
+        if top_k <= 0 or len(query_terms) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        
+        # Process terms from the largest possible contribution to the smallest
+        bounds = query_weights * self.max_weights[query_terms]
+        order = np.argsort(-bounds, kind='stable')
+        query_terms = np.asarray(query_terms)[order]
+        query_weights = np.asarray(query_weights)[order]
+        remaining = np.append(np.cumsum(bounds[order][::-1])[::-1], 0.0)
+        
+        candidates = np.zeros(0, dtype=self.doc_positions.dtype)
+        scores = np.zeros(0)
+        essential = True
+        
+        for i, (term, weight) in enumerate(zip(query_terms, query_weights)):
+            positions, weights = self.postings(term)
+            if allowed is not None:
+                keep = allowed[positions]
+                positions, weights = positions[keep], weights[keep]
+            
+            if essential:
+                # Any document in this posting list may still reach the top-k
+                merged = np.concatenate([candidates, positions])
+                candidates, inverse = np.unique(merged, return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate([scores, weight * weights]),
+                                     minlength=len(candidates))
+            elif len(candidates) == 0:
+                break
+            else:
+                # Only documents already in the candidate set can gain score
+                slots = np.searchsorted(candidates, positions)
+                slots[slots == len(candidates)] = 0
+                matched = candidates[slots] == positions
+                scores[slots[matched]] += weight * weights[matched]
+            
+            threshold = self._threshold(scores, top_k, min_score)
+            
+            # Unseen documents can score at most the remaining term bounds
+            if essential and remaining[i + 1] + 1e-12 < threshold:
+                essential = False
+            
+            if not essential:
+                keep = scores + remaining[i + 1] + 1e-12 >= threshold
+                candidates, scores = candidates[keep], scores[keep]
+        
+        # Partial top-k selection over the surviving candidates
+        return select_top_k(candidates, scores, top_k, min_score)
+    
+    def _threshold(self, scores: np.ndarray, top_k: int, min_score: float) -> float:
+        """Lowest score a document needs to still enter the top-k"""
+        if len(scores) < top_k:
+            return min_score
+        kth_score = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        return max(min_score, kth_score)
@@ -0,0 +1,215 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from scipy import sparse
+
+from inverted_index import InvertedIndex, select_top_k
+
+# Posting lists are rebuilt once more items than this changed since the last
+# build, or a larger share of the index; changed items are ranked directly
+MIN_CHANGED = 256
+REBUILD_FRACTION = 0.05
+
+class LSHIndex:
+    """Random-projection LSH tables over sparse vectors with exact cosine re-ranking
+    
+    Each table hashes a vector to the sign pattern of n_bits random
+    projections. The projection signs are derived from a hash of the feature
+    index, so no projection matrix is ever materialized and the index needs
+    no fitting. Queries only re-rank documents sharing a bucket with them.
+    
+    Short keyword queries have such low cosine similarity to long documents
+    that no table configuration finds them without scanning most of the
+    index (see scripts/benchmark_lsh_recall.py), so the tables only serve
+    document-to-document similarity. Keyword queries use search, which is
+    exact over posting lists of the stored vectors. With n_tables=0 no
+    tables are kept. Weights are kept in weight_dtype, e.g. float16 to halve
+    the footprint of float32; candidates are scored in at least float32.
+    """
+    
+    def __init__(self, n_tables: int = 32, n_bits: int = 8, multiprobe: bool = True, seed: int = 0,
+                 weight_dtype=np.float64):
+        if not 0 < n_bits < 63:
+            raise ValueError("n_bits must be between 1 and 62")
+        
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.multiprobe = multiprobe
+        self.weight_dtype = np.dtype(weight_dtype)
+        
+        rng = np.random.default_rng(seed)
+        self._seeds = rng.integers(0, 2 ** 63, size=n_tables * n_bits, dtype=np.uint64)
+        self._powers = np.uint64(1) << np.arange(n_bits, dtype=np.uint64)
+        
+        # table -> bucket key -> item ids
+        self.tables: List[Dict[int, set]] = [{} for _ in range(n_tables)]
+        
+        # item id -> (feature indices, weights, bucket keys)
+        self.vectors: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.n_features = 0
+        
+        # Posting lists over the items at the last rebuild, sorted by id, the
+        # mask of those still unchanged, and the ids changed since
+        self._postings: Optional[InvertedIndex] = None
+        self._posting_ids = np.zeros(0, dtype=np.int64)
+        self._live = np.zeros(0, dtype=bool)
+        self._changed: set = set()
+    
+    def __len__(self) -> int:
+        return len(self.vectors)
+    
+    def _signs(self, features: np.ndarray) -> np.ndarray:
+        """Pseudo-random +1/-1 projection entries for the given feature indices"""
+        # SplitMix64 finalizer over (feature, projection seed) pairs
+        with np.errstate(over='ignore'):
+            z = features.astype(np.uint64)[:, None] * np.uint64(0x9E3779B97F4A7C15) + self._seeds[None, :]
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z = z ^ (z >> np.uint64(31))
+        return np.where(z >> np.uint64(63), 1.0, -1.0)
+    
+    def _bucket_keys(self, matrix) -> np.ndarray:
+        """Hash each row of a sparse matrix to one bucket key per table"""
+        matrix = sparse.csr_matrix(matrix)
+        features = np.unique(matrix.indices)
+        if len(features) == 0:
+            return np.zeros((matrix.shape[0], self.n_tables), dtype=np.uint64)
+        
+        projections = matrix[:, features] @ self._signs(features)
+        bits = (projections > 0).reshape(matrix.shape[0], self.n_tables, self.n_bits)
+        return (bits.astype(np.uint64) * self._powers).sum(axis=2, dtype=np.uint64)
+    
+    def add_many(self, item_ids: List[int], matrix, chunk_size: int = 4096):
+        """Hash and insert the rows of a sparse matrix under the given ids"""
+        matrix = sparse.csr_matrix(matrix)
+        self.n_features = matrix.shape[1]
+        for start in range(0, matrix.shape[0], chunk_size):
+            chunk = matrix[start:start + chunk_size]
+            keys = self._bucket_keys(chunk)
+            
+            for row, item_id in enumerate(item_ids[start:start + chunk_size]):
+                self._discard(item_id)
+                begin, end = chunk.indptr[row], chunk.indptr[row + 1]
+                self.vectors[item_id] = (
+                    chunk.indices[begin:end].copy(), chunk.data[begin:end].astype(self.weight_dtype), keys[row]
+                )
+                self._changed.add(item_id)
+                for table, key in zip(self.tables, keys[row]):
+                    table.setdefault(int(key), set()).add(item_id)
+        
+        self._refresh_postings()
+    
+    def remove(self, item_id: int):
+        """Remove an item from every table"""
+        self._discard(item_id)
+        self._refresh_postings()
+    
+    def _discard(self, item_id: int):
+        """Drop an item's vector and bucket entries, masking it out of the posting lists"""
+        entry = self.vectors.pop(item_id, None)
+        if entry is None:
+            return
+        
+        self._changed.add(item_id)
+        position = np.searchsorted(self._posting_ids, item_id)
+        if position < len(self._posting_ids) and self._posting_ids[position] == item_id:
+            self._live[position] = False
+        
+        for table, key in zip(self.tables, entry[2]):
+            bucket = table.get(int(key))
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del table[int(key)]
+    
+    def _refresh_postings(self):
+        """Rebuild the posting lists once too many items changed to rank them directly"""
+        if len(self._changed) <= max(MIN_CHANGED, REBUILD_FRACTION * len(self.vectors)):
+            return
+        
+        item_ids = sorted(self.vectors)
+        self._postings = InvertedIndex(self._matrix(item_ids, self.n_features, self.weight_dtype))
+        self._posting_ids = np.asarray(item_ids, dtype=np.int64)
+        self._live = np.ones(len(item_ids), dtype=bool)
+        self._changed = set()
+    
+    def candidates(self, vector) -> List[int]:
+        """Collect items sharing a bucket with the vector, optionally probing 1-bit neighbours"""
+        keys = self._bucket_keys(vector)[0]
+        found = set()
+        for table, key in zip(self.tables, keys):
+            key = int(key)
+            found.update(table.get(key, ()))
+            if self.multiprobe:
+                for bit in range(self.n_bits):
+                    found.update(table.get(key ^ (1 << bit), ()))
+        return sorted(found)
+    
+    def query(self, vector, top_k: int = 5, min_score: float = 0.0,
+              allowed: Iterable[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k by cosine similarity, re-ranking bucket candidates exactly
+        
+        With allowed ids, only those are ranked; a filter selecting fewer
+        items than the buckets would is ranked exactly instead.
+        """
+        if allowed is None:
+            return self._rank(self.candidates(vector), vector, top_k, min_score)
+        
+        allowed = [item_id for item_id in allowed if item_id in self.vectors]
+        candidates = self.candidates(vector)
+        if len(allowed) <= len(candidates):
+            return self._rank(sorted(allowed), vector, top_k, min_score)
+        return self._rank(sorted(set(candidates).intersection(allowed)), vector, top_k, min_score)
+    
+    def search(self, vector, top_k: int = 5, min_score: float = 0.0,
+               allowed: Iterable[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k by cosine similarity, reading only the posting lists of the query's features
+        
+        Items changed since the posting lists were built are ranked
+        directly. With allowed ids, only those are ranked; a filter selecting
+        few items is ranked directly too.
+        """
+        vector = sparse.csr_matrix(vector)
+        if vector.nnz == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        
+        live = self._live
+        changed = [item_id for item_id in self._changed if item_id in self.vectors]
+        if allowed is not None:
+            allowed = {item_id for item_id in allowed if item_id in self.vectors}
+            if len(allowed) <= MIN_CHANGED:
+                return self._rank(sorted(allowed), vector, top_k, min_score)
+            live = live & np.isin(self._posting_ids, list(allowed))
+            changed = [item_id for item_id in changed if item_id in allowed]
+        
+        item_ids, scores = self._rank(sorted(changed), vector, top_k, min_score)
+        if self._postings is not None:
+            positions, posting_scores = self._postings.search(vector.indices, vector.data, top_k, min_score, live)
+            item_ids = np.concatenate([item_ids, self._posting_ids[positions]])
+            scores = np.concatenate([scores, posting_scores])
+        
+        return select_top_k(item_ids, scores, top_k, min_score)
+    
+    def exact_query(self, vector, top_k: int = 5, min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k over every stored vector, used as the recall reference"""
+        return self._rank(sorted(self.vectors), vector, top_k, min_score)
+    
+    def _rank(self, item_ids: List[int], vector, top_k: int, min_score: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Score items against an L2-normalized query vector"""
+        if not item_ids or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        
+        candidates = self._matrix(item_ids, vector.shape[1], np.promote_types(self.weight_dtype, np.float32))
+        scores = (candidates @ sparse.csr_matrix(vector).T).toarray().ravel()
+        positions, scores = select_top_k(np.arange(len(item_ids)), scores, top_k, min_score)
+        return np.asarray(item_ids, dtype=np.int64)[positions], scores
+    
+    def _matrix(self, item_ids: List[int], n_features: int, dtype) -> sparse.csr_matrix:
+        """Stack the stored vectors of items into a sparse matrix with weights in dtype"""
+        entries = [self.vectors[item_id] for item_id in item_ids]
+        indptr = np.zeros(len(entries) + 1, dtype=np.int64)
+        np.cumsum([len(entry[0]) for entry in entries], out=indptr[1:])
+        weights = np.concatenate([entry[1] for entry in entries]).astype(dtype, copy=False)
+        return sparse.csr_matrix(
+            (weights, np.concatenate([entry[0] for entry in entries]), indptr),
+            shape=(len(entries), n_features)
+        )
@@ -0,0 +1,96 @@
+import zlib
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Mersenne prime of the universal hash family; shingle hashes are reduced below it
+PRIME = (1 << 31) - 1
+
+# Shingles hashed per step, bounding the (permutations x shingles) work array
+CHUNK_SIZE = 4096
+
+class MinHashIndex:
+    """MinHash signatures of character shingles with an LSH band index
+    
+    Two texts whose shingle sets have Jaccard similarity s share at least
+    one band with probability 1 - (1 - s^rows)^bands, so near-duplicates are
+    found by bucket lookups instead of a comparison with every stored
+    signature. Candidates are then confirmed on their estimated similarity.
+    Character shingles keep rescans with small OCR differences similar.
+    """
+    
+    def __init__(self, num_perm: int = 120, bands: int = 20, shingle_size: int = 5, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+        
+        # band -> band key -> item ids
+        self.tables: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        
+        # item id -> signature
+        self.signatures: Dict[int, np.ndarray] = {}
+    
+    def __len__(self) -> int:
+        return len(self.signatures)
+    
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the lowercased, whitespace-normalized text"""
+        text = ' '.join(text.lower().split())
+        size = self.shingle_size
+        shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+        ) % np.uint64(PRIME)
+        
+        # a * x + b stays below 2^63 because a, x and b are all below 2^31
+        signature = np.full(self.num_perm, PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), CHUNK_SIZE):
+            chunk = hashes[start:start + CHUNK_SIZE]
+            permuted = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % np.uint64(PRIME)
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        
+        return signature.astype(np.uint32)
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+    
+    def add(self, item_id: int, signature: np.ndarray):
+        """Insert a signature under an id"""
+        self.remove(item_id)
+        self.signatures[item_id] = signature
+        for table, key in zip(self.tables, self._band_keys(signature)):
+            table.setdefault(key, set()).add(item_id)
+    
+    def remove(self, item_id: int):
+        """Remove an item from every band"""
+        signature = self.signatures.pop(item_id, None)
+        if signature is None:
+            return
+        
+        for table, key in zip(self.tables, self._band_keys(signature)):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del table[key]
+    
+    def query(self, signature: np.ndarray, threshold: float) -> List[Tuple[int, float]]:
+        """Items sharing a band with the signature and at least threshold similar, most similar first"""
+        candidates = set()
+        for table, key in zip(self.tables, self._band_keys(signature)):
+            candidates.update(table.get(key, ()))
+        
+        matches = []
+        for item_id in candidates:
+            similarity = float(np.mean(self.signatures[item_id] == signature))
+            if similarity >= threshold:
+                matches.append((item_id, similarity))
+        
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
@@ -0,0 +1,302 @@
+import hashlib
+import heapq
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from minhash_index import MinHashIndex
+from shared_index import unlink_shared_index
+from vector_store import VectorStore
+
+# Pool worker state: db path -> (data_version seen, read-only store opened in the worker)
+_worker_shards: Dict[str, Tuple[int, VectorStore]] = {}
+
+def _open_worker_shard(db_path: str, store_kwargs: Dict[str, Any]) -> VectorStore:
+    """Get a worker's read-only store for a shard, catching it up once another process has written to it"""
+    cached = _worker_shards.get(db_path)
+    if cached is None:
+        store = VectorStore(db_path=db_path, **store_kwargs)
+        _worker_shards[db_path] = (store.connections.get().execute('PRAGMA data_version').fetchone()[0], store)
+        return store
+    
+    # data_version only changes when a different connection commits; it is
+    # read before catching up, so a write landing meanwhile is seen next time
+    version, store = cached
+    latest = store.connections.get().execute('PRAGMA data_version').fetchone()[0]
+    if latest != version:
+        store.refresh()
+        _worker_shards[db_path] = (latest, store)
+    return store
+
+def _search_shard(db_path: str, store_kwargs: Dict[str, Any], method: str, query: str, top_k: int,
+                  filters: Dict[str, Any]) -> List[Dict]:
+    """Run one shard's search inside a pool worker"""
+    return getattr(_open_worker_shard(db_path, store_kwargs), method)(query, top_k, **filters)
+
+class ShardedVectorStore:
+    """Documents hash-partitioned across several SQLite-backed VectorStores
+    
+    Global document ids encode their shard as local_id * n_shards + shard, so
+    reads and deletes go straight to one shard. Searches fan out to every
+    shard over single-process executors, each owning a fixed set of shards
+    it opens read-only, and merge the per-shard top-k results. Workers
+    catch up with writes incrementally; TF-IDF shards publish their index
+    to shared memory, so workers attach it instead of refitting. Each
+    shard fits its own index, so scores are comparable but not identical to
+    those of a single store over the same documents. Every document stays
+    in the shard its hash picks; near-duplicates are looked up in every
+    shard's MinHash index and skipped or reported by the duplicates policy,
+    but only one in the same shard is recorded as duplicate_of, since that
+    column holds shard-local ids.
+    """
+    
+    def __init__(self, db_dir: str = "data/shards", n_shards: int = 4, processes: Optional[int] = None,
+                 **store_kwargs):
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+        
+        self.db_dir = db_dir
+        self.n_shards = n_shards
+        self.logger = logging.getLogger(__name__)
+        
+        # processes=0 searches the shards one after another in this process
+        self.processes = min(n_shards, os.cpu_count() or 1) if processes is None else min(processes, n_shards)
+        self._pools = []
+        
+        # TF-IDF shards each share their index under a name derived from the directory
+        self.shared_names = [None] * n_shards
+        if store_kwargs.get('scorer', 'tfidf') == 'tfidf':
+            prefix = store_kwargs.pop('shared_index', None) or "shards-" + hashlib.blake2b(
+                os.path.abspath(db_dir).encode('utf-8'), digest_size=5).hexdigest()
+            self.shared_names = [f"{prefix}-{shard:02d}" for shard in range(n_shards)]
+        
+        os.makedirs(db_dir, exist_ok=True)
+        self.shard_paths = [os.path.join(db_dir, f"shard-{shard:02d}.db") for shard in range(n_shards)]
+        self.shard_kwargs = [dict(store_kwargs, shared_index=name) for name in self.shared_names]
+        self.shards = [VectorStore(db_path=path, **kwargs) for path, kwargs in zip(self.shard_paths, self.shard_kwargs)]
+        
+        # Workers only search: no duplicate detection, neighbour graph or writes
+        self.worker_kwargs = [
+            dict(kwargs, duplicates='off', neighbors=0, read_only=True) for kwargs in self.shard_kwargs
+        ]
+    
+    def _shard_for(self, filename: str, content: str) -> int:
+        """Pick a document's shard from a stable hash of its filename and content"""
+        digest = hashlib.blake2b(f"{filename}\0{content}".encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % self.n_shards
+    
+    def _foreign_duplicate(self, shard: int, signature, seen: MinHashIndex = None,
+                           placed: Dict[int, int] = None) -> Optional[int]:
+        """Global ID of the most similar near-duplicate of a document stored in another shard
+        
+        seen holds signatures of earlier documents of the same batch, by
+        position, and placed the shards chosen for them; such a match is
+        returned as -position - 1. Returns None when the document's own
+        shard holds a near-duplicate, which that shard already handles.
+        """
+        threshold = self.shards[0].duplicate_threshold
+        matches = [
+            (other, self._global_id(other, local_id), similarity)
+            for other, store in enumerate(self.shards)
+            for local_id, similarity in store.minhash_index.query(signature, threshold)
+        ]
+        if seen is not None:
+            matches += [(placed[position], -position - 1, similarity)
+                        for position, similarity in seen.query(signature, threshold)]
+        
+        if not matches or any(match[0] == shard for match in matches):
+            return None
+        return max(matches, key=lambda match: match[2])[1]
+    
+    def _global_id(self, shard: int, local_id: int) -> int:
+        return local_id * self.n_shards + shard
+    
+    def _locate(self, document_id: int) -> Tuple[VectorStore, int]:
+        """Split a global id into its shard store and local id"""
+        return self.shards[document_id % self.n_shards], document_id // self.n_shards
+    
+    def _globalize(self, shard: int, doc: Dict) -> Dict:
+        """Rewrite the shard-local ids of a result to global ids"""
+        for key in ('id', 'document_id', 'passage_id', 'duplicate_of'):
+            if doc.get(key) is not None:
+                doc[key] = self._global_id(shard, doc[key])
+        return doc
+    
+    def add_document(self, filename: str, content: str, document_type: str = None, metadata: Dict = None) -> int:
+        """Add a document to its shard, returning -1 like VectorStore when it fails"""
+        shard = self._shard_for(filename, content)
+        store = self.shards[shard]
+        if store.minhash_index is not None:
+            duplicate_of = self._foreign_duplicate(shard, store.minhash_index.signature(content))
+            if duplicate_of is not None and store.duplicates == 'skip':
+                self.logger.info(f"Document '{filename}' skipped as a near-duplicate of {duplicate_of}")
+                return duplicate_of
+            if duplicate_of is not None:
+                self.logger.warning(f"Document '{filename}' is a near-duplicate of {duplicate_of} in another shard")
+        
+        local_id = store.add_document(filename, content, document_type, metadata)
+        return self._global_id(shard, local_id) if local_id > 0 else -1
+    
+    def add_documents(self, documents: Iterable[Dict], batch_size: int = 500) -> Dict:
+        """Bulk-add documents, one batched import per shard
+        
+        Near-duplicates found in any shard are reported as {input position:
+        global ID of the earlier document} under 'duplicates'.
+        """
+        partitions = [[] for _ in range(self.n_shards)]
+        positions = [[] for _ in range(self.n_shards)]
+        minhash_index = self.shards[0].minhash_index
+        seen = MinHashIndex() if minhash_index is not None else None
+        placed = {}
+        duplicates = {}
+        skipped = set()
+        count = 0
+        for position, doc in enumerate(documents):
+            count += 1
+            shard = self._shard_for(doc['filename'], doc['content'])
+            if seen is not None:
+                signature = minhash_index.signature(doc['content'])
+                duplicate_of = self._foreign_duplicate(shard, signature, seen, placed)
+                if duplicate_of is not None:
+                    duplicates[position] = duplicate_of
+                    if self.shards[shard].duplicates == 'skip':
+                        skipped.add(position)
+                        continue
+                seen.add(position, signature)
+                placed[position] = shard
+            partitions[shard].append(doc)
+            positions[shard].append(position)
+        
+        ids = [None] * count
+        reports = []
+        for shard, partition in enumerate(partitions):
+            if not partition:
+                continue
+            report = self.shards[shard].add_documents(partition, batch_size=batch_size)
+            for position, local_id in zip(positions[shard], report['ids']):
+                ids[position] = self._global_id(shard, local_id)
+            for position, local_id in report.get('duplicates', {}).items():
+                duplicates[positions[shard][position]] = self._global_id(shard, local_id)
+            reports.append(report)
+        
+        # Resolve duplicates of earlier documents of this import, in input order
+        for position in sorted(duplicates):
+            duplicate_of = duplicates[position]
+            if duplicate_of < 0:
+                duplicate_of = duplicates[position] = ids[-duplicate_of - 1]
+            if position in skipped:
+                ids[position] = duplicate_of
+        
+        # Ids are returned in input order; a failed shard import leaves None
+        return {
+            'ids': ids,
+            'duplicates': duplicates,
+            'shards': reports,
+            'total_seconds': sum(report['total_seconds'] for report in reports)
+        }
+    
+    def search_documents(self, query: str, top_k: int = 5, **filters) -> List[Dict]:
+        """Search every shard in parallel and merge their top-k documents
+        
+        Filters are those of VectorStore.search_documents and run on each shard.
+        """
+        return self._fan_out('search_documents', query, top_k, filters)
+    
+    def search_passages(self, query: str, top_k: int = 5, **filters) -> List[Dict]:
+        """Search every shard's passages in parallel and merge their top-k passages"""
+        return self._fan_out('search_passages', query, top_k, filters)
+    
+    def _fan_out(self, method: str, query: str, top_k: int, filters: Dict[str, Any]) -> List[Dict]:
+        """Run a search on all shards and keep the overall best results"""
+        try:
+            if self.processes > 0:
+                futures = [
+                    self._pool_for(shard).submit(_search_shard, self.shard_paths[shard], self.worker_kwargs[shard],
+                                                 method, query, top_k, filters)
+                    for shard in range(self.n_shards)
+                ]
+                shard_results = [future.result() for future in futures]
+            else:
+                shard_results = [getattr(store, method)(query, top_k, **filters) for store in self.shards]
+            
+            merged = [
+                self._globalize(shard, doc)
+                for shard, results in enumerate(shard_results)
+                for doc in results
+            ]
+            return heapq.nlargest(top_k, merged, key=lambda doc: doc['similarity'])
+            
+        except Exception as e:
+            self.logger.error(f"Error searching shards: {str(e)}")
+            return []
+    
+    def _pool_for(self, shard: int) -> ProcessPoolExecutor:
+        """The single-process executor that owns a shard, so each shard is held by one worker"""
+        if not self._pools:
+            self._pools = [ProcessPoolExecutor(max_workers=1) for _ in range(self.processes)]
+        return self._pools[shard % self.processes]
+    
+    def get_document(self, document_id: int) -> Dict:
+        """Get a specific document by its global ID"""
+        store, local_id = self._locate(document_id)
+        doc = store.get_document(local_id)
+        return self._globalize(document_id % self.n_shards, doc) if doc else doc
+    
+    def similar_documents(self, document_id: int, k: int = 5) -> List[Dict]:
+        """Get the documents most similar to one from its shard's neighbour graph"""
+        store, local_id = self._locate(document_id)
+        return [self._globalize(document_id % self.n_shards, doc) for doc in store.similar_documents(local_id, k)]
+    
+    def delete_document(self, document_id: int) -> bool:
+        """Delete a document from its shard"""
+        store, local_id = self._locate(document_id)
+        return store.delete_document(local_id)
+    
+    def iter_documents(self, columns: List[str] = None, preview_chars: int = None,
+                       after: Optional[Tuple[str, int]] = None, limit: int = None) -> Iterator[Dict]:
+        """Lazily iterate documents of all shards, newest first, with global keyset pagination"""
+        streams = []
+        for shard, store in enumerate(self.shards):
+            shard_after = None
+            if after is not None:
+                # local_id * n + shard < global id  <=>  local_id < ceil((global id - shard) / n)
+                shard_after = (after[0], -(-(after[1] - shard) // self.n_shards))
+            streams.append(self._iter_shard(shard, store.iter_documents(columns, preview_chars,
+                                                                        after=shard_after, limit=limit)))
+        
+        merged = heapq.merge(*streams, key=lambda doc: (doc['timestamp'], doc['id']), reverse=True)
+        for count, doc in enumerate(merged):
+            if limit is not None and count >= limit:
+                break
+            yield doc
+    
+    def _iter_shard(self, shard: int, documents: Iterator[Dict]) -> Iterator[Dict]:
+        for doc in documents:
+            yield self._globalize(shard, doc)
+    
+    def list_documents(self) -> List[Dict]:
+        """List all documents in every shard"""
+        return list(self.iter_documents())
+    
+    def get_document_stats(self) -> Dict:
+        """Get statistics summed over all shards"""
+        stats = {'total_documents': 0, 'documents_by_type': {}, 'recent_documents': 0}
+        for store in self.shards:
+            shard_stats = store.get_document_stats()
+            stats['total_documents'] += shard_stats.get('total_documents', 0)
+            stats['recent_documents'] += shard_stats.get('recent_documents', 0)
+            for document_type, count in shard_stats.get('documents_by_type', {}).items():
+                stats['documents_by_type'][document_type] = stats['documents_by_type'].get(document_type, 0) + count
+        return stats
+    
+    def close(self):
+        """Stop the workers, close every shard and remove the shared indexes"""
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools = []
+        for store in self.shards:
+            store.close()
+        for name in self.shared_names:
+            if name is not None:
+                unlink_shared_index(name)
@@ -0,0 +1,171 @@
+import json
+import os
+import logging
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+# Arrays start on cache-line boundaries after the JSON header
+ALIGNMENT = 64
+
+# Little-endian length prefix of the header, and the control segment's slots:
+# the latest version, then a count of deletes announced since it was created
+COUNTER = np.dtype('<u8')
+CONTROL_SLOTS = 2
+
+logger = logging.getLogger(__name__)
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+def _open_segment(name: str, size: int = 0, create: bool = False) -> shared_memory.SharedMemory:
+    """Open a segment that outlives this process instead of being unlinked when it exits"""
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if os.name == 'posix':
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+def _unlink_segment(name: str):
+    """Unlink a segment by name; processes that attached it keep their mapping"""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+def _write_array(segment: shared_memory.SharedMemory, offset: int, array: np.ndarray):
+    np.ndarray(array.shape, array.dtype, buffer=segment.buf, offset=offset)[...] = array
+
+def unlink_shared_index(name: str):
+    """Remove a shared index's control segment and latest version, e.g. when the app shuts down"""
+    try:
+        control = _open_segment(f"{name}-version")
+    except FileNotFoundError:
+        return
+    version = int.from_bytes(control.buf[:COUNTER.itemsize], 'little')
+    control.close()
+    
+    _unlink_segment(f"{name}-{version}")
+    _unlink_segment(f"{name}-version")
+
+class SharedIndex:
+    """Versioned read-only index arrays in shared memory, published once and attached zero-copy
+    
+    Publishing copies the arrays into a new segment named after the next
+    version, then bumps the version in a small control segment. Processes
+    compare that version on every search and attach the new segment when
+    it changes. The previous version is unlinked on publish; processes that
+    still map it keep it until they move on. Deletes only hide documents,
+    so instead of a new version they bump a counter telling processes to
+    reload the deleted ids. Callers must serialize publishers and deletes
+    across processes, e.g. with a database write lock.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        try:
+            self._control = _open_segment(f"{name}-version", CONTROL_SLOTS * COUNTER.itemsize, create=True)
+        except FileExistsError:
+            self._control = _open_segment(f"{name}-version")
+        self._counters = np.ndarray((CONTROL_SLOTS,), dtype=COUNTER, buffer=self._control.buf)
+        
+        # Version and fingerprint attached by this process
+        self.version = 0
+        self.fingerprint = None
+        
+        # Attached segments; older ones close once no snapshot references their arrays
+        self._segments = []
+    
+    def latest_version(self) -> int:
+        """Version most recently published by any process"""
+        return int(self._counters[0])
+    
+    def latest_deletes(self) -> int:
+        """Deletes announced by any process"""
+        return int(self._counters[1])
+    
+    def announce_delete(self):
+        """Tell every process that documents were deleted, after the delete is committed"""
+        self._counters[1] += 1
+    
+    def publish(self, fingerprint: str, vocabulary: Dict[str, int], arrays: Dict[str, np.ndarray]) -> int:
+        """Copy index arrays into a new version and make it the latest"""
+        previous = self.latest_version()
+        version = previous + 1
+        
+        arrays = {key: np.ascontiguousarray(array) for key, array in arrays.items()}
+        layout = {}
+        size = 0
+        for key, array in arrays.items():
+            layout[key] = (size, array.dtype.str, array.shape)
+            size += _aligned(array.nbytes)
+        
+        header = json.dumps({'fingerprint': fingerprint, 'vocabulary': vocabulary, 'arrays': layout}).encode('utf-8')
+        start = _aligned(COUNTER.itemsize + len(header))
+        
+        segment = _open_segment(f"{self.name}-{version}", start + max(size, 1), create=True)
+        try:
+            segment.buf[:COUNTER.itemsize] = len(header).to_bytes(COUNTER.itemsize, 'little')
+            segment.buf[COUNTER.itemsize:COUNTER.itemsize + len(header)] = header
+            for key, array in arrays.items():
+                _write_array(segment, start + layout[key][0], array)
+        finally:
+            segment.close()
+        
+        self._counters[0] = version
+        if previous:
+            _unlink_segment(f"{self.name}-{previous}")
+        
+        logger.info(f"Published shared index {self.name} version {version} ({start + size} bytes)")
+        return version
+    
+    def attach(self) -> Optional[Tuple[str, Dict[str, int], Dict[str, np.ndarray]]]:
+        """Map the latest version if it is newer than the attached one
+        
+        Returns its fingerprint, vocabulary and read-only arrays backed by
+        the shared segment, or None when there is nothing new to attach.
+        """
+        while True:
+            version = self.latest_version()
+            if version in (0, self.version):
+                return None
+            try:
+                segment = _open_segment(f"{self.name}-{version}")
+                break
+            except FileNotFoundError:
+                # Unlinked by a newer publish after the version was read
+                if self.latest_version() == version:
+                    return None
+        
+        length = int.from_bytes(segment.buf[:COUNTER.itemsize], 'little')
+        header = json.loads(bytes(segment.buf[COUNTER.itemsize:COUNTER.itemsize + length]).decode('utf-8'))
+        start = _aligned(COUNTER.itemsize + length)
+        
+        arrays = {}
+        for key, (offset, dtype, shape) in header['arrays'].items():
+            array = np.ndarray(tuple(shape), np.dtype(dtype), buffer=segment.buf, offset=start + offset)
+            array.flags.writeable = False
+            arrays[key] = array
+        
+        self._release_unused()
+        self._segments.append(segment)
+        self.version = version
+        self.fingerprint = header['fingerprint']
+        return header['fingerprint'], header['vocabulary'], arrays
+    
+    def _release_unused(self):
+        """Close attached segments whose arrays are no longer referenced"""
+        in_use = []
+        for segment in self._segments:
+            try:
+                segment.close()
+            except BufferError:
+                in_use.append(segment)
+        self._segments = in_use
+    
+    def close(self):
+        """Detach from every segment no longer in use, leaving the shared index in place for other processes"""
+        self._release_unused()
+        del self._counters
+        self._control.close()
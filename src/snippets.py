@@ -0,0 +1,36 @@
+import re
+from typing import Iterable
+
+# Share of the window kept in front of the first match, so the match reads in context
+LEAD_FRACTION = 0.25
+
+def highlight(text: str, terms: Iterable[str], width: int = 200, marker: str = '**') -> str:
+    """Cut about width characters around the first matched term and mark every match in them
+    
+    Whitespace is collapsed, the window is trimmed to whole words and
+    ellipses show where text was cut. Without a match the window starts
+    at the beginning of the text.
+    """
+    text = ' '.join(text.split())
+    terms = sorted({term for term in terms if term}, key=len, reverse=True)
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\b', re.IGNORECASE) if terms else None
+    
+    match = pattern.search(text) if pattern else None
+    start = max(match.start() - int(width * LEAD_FRACTION), 0) if match else 0
+    end = min(start + width, len(text))
+    if end == len(text):
+        start = max(end - width, 0)
+    
+    # Move the cuts to word boundaries, unless a single word spans the window
+    if start > 0:
+        boundary = text.find(' ', start - 1, end)
+        start = boundary + 1 if boundary >= 0 else start
+    if end < len(text):
+        boundary = text.rfind(' ', start, end + 1)
+        end = boundary if boundary > start else end
+    
+    window = text[start:end]
+    if pattern:
+        window = pattern.sub(lambda term: f"{marker}{term.group(0)}{marker}", window)
+    
+    return ('... ' if start > 0 else '') + window + (' ...' if end < len(text) else '')
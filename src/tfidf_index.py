@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field, replace
+from typing import FrozenSet, Iterable, Optional
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from inverted_index import InvertedIndex
+
+def _empty_ids() -> np.ndarray:
+    return np.zeros(0, dtype=np.int64)
+
+def _cleared(live: Optional[np.ndarray], ids: np.ndarray, document_ids: np.ndarray) -> Optional[np.ndarray]:
+    """Copy of a live mask (None when all are live) with the positions of the given documents cleared
+    
+    The ids are sorted, so each document's positions are found by binary
+    search. The mask itself is returned when none of the documents is held.
+    """
+    starts = np.searchsorted(ids, document_ids, side='left')
+    ends = np.searchsorted(ids, document_ids, side='right')
+    found = starts < ends
+    if not found.any():
+        return live
+    
+    live = np.ones(len(ids), dtype=bool) if live is None else live.copy()
+    for start, end in zip(starts[found], ends[found]):
+        live[start:end] = False
+    return live
+
+@dataclass(frozen=True)
+class TfidfIndex:
+    """Immutable snapshot of the fitted TF-IDF search state
+    
+    A query reads the store's current snapshot once and uses only that
+    object, so a writer publishing a new snapshot never changes what an
+    in-flight query sees. Deletes publish a copy with new live masks instead
+    of editing the arrays in place.
+    """
+    vectorizer: Optional[TfidfVectorizer] = None
+    
+    # Document ids, TF-IDF rows and term posting lists
+    doc_ids: np.ndarray = field(default_factory=_empty_ids)
+    doc_matrix: object = None
+    inverted_index: Optional[InvertedIndex] = None
+    
+    # Passage ids, their parent documents (sorted) and posting lists
+    passage_ids: np.ndarray = field(default_factory=_empty_ids)
+    passage_document_ids: np.ndarray = field(default_factory=_empty_ids)
+    passage_index: Optional[InvertedIndex] = None
+    
+    # Deleted documents hidden from search until the next refit; the live
+    # masks are None while nothing in the snapshot is tombstoned
+    tombstones: FrozenSet[int] = frozenset()
+    doc_live: Optional[np.ndarray] = None
+    passage_live: Optional[np.ndarray] = None
+    
+    @property
+    def is_empty(self) -> bool:
+        return self.doc_matrix is None or self.doc_matrix.shape[0] == 0
+    
+    def with_tombstones(self, tombstones: Iterable[int], prune: bool = False) -> 'TfidfIndex':
+        """Copy of the snapshot hiding the given documents
+        
+        Pruning forgets tombstones of documents the snapshot does not hold,
+        which is only safe for a snapshot fitted after those deletes.
+        """
+        tombstones = frozenset(tombstones)
+        deleted = np.fromiter(tombstones, dtype=np.int64, count=len(tombstones))
+        doc_live = _cleared(None, self.doc_ids, deleted)
+        if prune:
+            tombstones = frozenset() if doc_live is None else frozenset(self.doc_ids[~doc_live].tolist())
+        
+        return replace(
+            self,
+            tombstones=tombstones,
+            doc_live=doc_live,
+            passage_live=_cleared(None, self.passage_document_ids, deleted)
+        )
+    
+    def with_tombstone(self, document_id: int) -> 'TfidfIndex':
+        """Copy of the snapshot also hiding one document, or the snapshot itself if it does not hold it
+        
+        Only the document's own positions are cleared in copies of the live
+        masks, so a delete does not rescan the tombstones already applied.
+        """
+        deleted = np.array([document_id], dtype=np.int64)
+        doc_live = _cleared(self.doc_live, self.doc_ids, deleted)
+        if doc_live is self.doc_live:
+            return self
+        
+        return replace(
+            self,
+            tombstones=self.tombstones | {document_id},
+            doc_live=doc_live,
+            passage_live=_cleared(self.passage_live, self.passage_document_ids, deleted)
+        )
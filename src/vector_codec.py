@@ -0,0 +1,75 @@
+from typing import List
+import numpy as np
+from scipy import sparse
+
+# Weight precisions for stored vectors; int8 rows also store one float32 scale.
+# int8 only shrinks storage: rows are dequantized to a float dtype when read,
+# so in memory an int8 store weighs the same as a float16 one
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# A binary row starts with a weight tag and an index tag, then (for int8)
+# its scale, then the little-endian index and weight arrays
+WEIGHT_DTYPES = {b'f': np.dtype('<f4'), b'e': np.dtype('<f2'), b'b': np.dtype('i1')}
+WEIGHT_TAGS = {'float32': b'f', 'float16': b'e', 'int8': b'b'}
+INDEX_DTYPES = {b'H': np.dtype('<u2'), b'I': np.dtype('<u4')}
+SCALE_DTYPE = np.dtype('<f4')
+
+# Largest int8 magnitude; a row's largest weight is quantized to it
+INT8_MAX = 127
+
+def encode_vector(indices: np.ndarray, weights: np.ndarray, precision: str) -> bytes:
+    """Pack one sparse row as a BLOB, with 16-bit indices when they fit"""
+    if precision not in WEIGHT_TAGS:
+        raise ValueError(f"Unknown vector precision '{precision}', expected one of {PRECISIONS}")
+    
+    index_tag = b'H' if len(indices) == 0 or int(indices.max()) <= np.iinfo(np.uint16).max else b'I'
+    header = WEIGHT_TAGS[precision] + index_tag
+    
+    if precision == 'int8':
+        peak = float(np.abs(weights).max()) if len(weights) else 0.0
+        scale = peak / INT8_MAX if peak else 1.0
+        header += np.array([scale], dtype=SCALE_DTYPE).tobytes()
+        weights = np.round(weights / scale)
+    
+    return (header + indices.astype(INDEX_DTYPES[index_tag]).tobytes()
+            + weights.astype(WEIGHT_DTYPES[WEIGHT_TAGS[precision]]).tobytes())
+
+def encode_rows(matrix, precision: str) -> List[bytes]:
+    """Pack every row of a sparse matrix"""
+    matrix = sparse.csr_matrix(matrix)
+    return [
+        encode_vector(matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]],
+                      matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]], precision)
+        for row in range(matrix.shape[0])
+    ]
+
+def decode_vector(value: bytes):
+    """Unpack one stored row into (indices, weights, scale)"""
+    weight_dtype, index_dtype = WEIGHT_DTYPES[value[:1]], INDEX_DTYPES[value[1:2]]
+    offset = 2
+    scale = 1.0
+    if weight_dtype == np.int8:
+        scale = float(np.frombuffer(value, dtype=SCALE_DTYPE, count=1, offset=offset)[0])
+        offset += SCALE_DTYPE.itemsize
+    
+    nnz = (len(value) - offset) // (index_dtype.itemsize + weight_dtype.itemsize)
+    indices = np.frombuffer(value, dtype=index_dtype, count=nnz, offset=offset)
+    weights = np.frombuffer(value, dtype=weight_dtype, count=nnz, offset=offset + nnz * index_dtype.itemsize)
+    return indices, weights, scale
+
+def decode_rows(encoded: List[bytes], n_features: int, dtype=np.float64):
+    """Rebuild a sparse matrix from stored rows, in the given weight dtype"""
+    rows = [decode_vector(value) for value in encoded]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(indices) for indices, _, _ in rows], out=indptr[1:])
+    
+    if not rows:
+        return sparse.csr_matrix((0, n_features), dtype=dtype)
+    
+    # int8 weights are multiplied back by their row's scale
+    weights = np.concatenate([
+        weights.astype(dtype) if scale == 1.0 else (weights.astype(np.float32) * scale).astype(dtype)
+        for _, weights, scale in rows
+    ])
+    indices = np.concatenate([indices for indices, _, _ in rows]).astype(np.int32)
+    return sparse.csr_matrix((weights, indices, indptr), shape=(len(rows), n_features))
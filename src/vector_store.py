@@ -1,39 +1,185 @@
 import json
 import os
-from typing import List, Dict, Any
-import sqlite3
-from datetime import datetime
+import re
+import time
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from dataclasses import replace
+import threading
+from contextlib import nullcontext
+from datetime import date, datetime
 import logging
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from scipy import sparse
 import numpy as np
 
+from inverted_index import InvertedIndex, select_top_k
+from bm25_index import BM25Index
+from lsh_index import LSHIndex
+from minhash_index import MinHashIndex
+from tfidf_index import TfidfIndex
+from rw_lock import ReadWriteLock
+from index_snapshot import save_snapshot, load_snapshot
+from shared_index import SharedIndex
+from connection_manager import ConnectionManager
+from content_codec import CODECS, SQL_FUNCTIONS, compress_content, content_sql, content_substr_sql
+from vector_codec import PRECISIONS, encode_rows, decode_rows
+from result_cache import ResultCache
+from snippets import highlight
+
+# Weakest link kept in the similar-documents graph
+NEIGHBOR_MIN_SIMILARITY = 0.1
+
+# Stored content, decompressed in SQL only where a query actually reads it
+CONTENT_SQL = content_sql()
+PASSAGE_TEXT_SQL = content_substr_sql('d', 'p.start_offset + 1', 'p.end_offset - p.start_offset')
+
 class VectorStore:
-    """Local vector storage for medical documents using SQLite and TF-IDF"""
+    """Local vector storage for medical documents using SQLite and TF-IDF, BM25, FTS5 or hashed vectors
+    
+    One instance can be shared by many threads. Ingest and delete are
+    serialized by a writer lock. Searches run in parallel: they share the
+    read side of a reader-writer lock whose write side is only held while
+    the BM25 or LSH indexes are updated in place, and TF-IDF searches read
+    an immutable snapshot, so no search waits on a transaction or a refit.
+    """
+    
+    SCORERS = ('tfidf', 'bm25', 'fts5', 'hashing')
+    
+    # What ingest does with a near-duplicate of a stored document
+    DUPLICATE_POLICIES = ('off', 'flag', 'skip')
+    
+    # Columns callers may project in iter_documents
+    DOCUMENT_COLUMNS = ('id', 'filename', 'content', 'document_type', 'timestamp', 'metadata')
     
-    def __init__(self, db_path: str = "data/health_documents.db"):
+    # Characters of highlighted text in each search hit
+    SNIPPET_CHARS = 200
+    
+    def __init__(self, db_path: str = "data/health_documents.db", scorer: str = 'tfidf',
+                 snapshot_dir: str = None, passage_words: int = 120, passage_overlap: int = 30,
+                 cache_size: int = 256, compression: str = 'none', compaction_threshold: float = 0.2,
+                 shared_index: str = None, duplicates: str = 'flag', duplicate_threshold: float = 0.85,
+                 neighbors: int = 0, vector_precision: str = 'float16', read_only: bool = False):
+        if scorer not in self.SCORERS:
+            raise ValueError(f"Unknown scorer '{scorer}', expected one of {self.SCORERS}")
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {CODECS}")
+        if duplicates not in self.DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicates policy '{duplicates}', expected one of {self.DUPLICATE_POLICIES}")
+        if vector_precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision '{vector_precision}', expected one of {PRECISIONS}")
+        if neighbors < 0:
+            raise ValueError("neighbors must not be negative")
+        if not 0 <= passage_overlap < passage_words:
+            raise ValueError("passage_overlap must be smaller than passage_words")
+        
         self.db_path = db_path
+        self.scorer = scorer
+        self.snapshot_dir = snapshot_dir or f"{db_path}.index"
+        self.passage_words = passage_words
+        self.passage_overlap = passage_overlap
+        self.compression = compression
+        self.compaction_threshold = compaction_threshold
+        self.duplicates = duplicates
+        self.duplicate_threshold = duplicate_threshold
+        self.neighbors = neighbors
+        
+        # Search-only stores over a database another store writes: they never
+        # refit or write, and catch up with its writes through refresh()
+        self.read_only = read_only
+        
+        # Stored weight format of hashed vectors; int8 saves disk only, as
+        # loaded vectors are float16 or wider. TF-IDF rows, which rebuild the
+        # fitted index when its snapshot is missing, are always float32
+        self.vector_precision = vector_precision
         self.logger = logging.getLogger(__name__)
         
         # Create data directory if it doesn't exist
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
-        # Initialize database
-        self._init_database()
+        # Persistent per-thread connections shared by every method
+        self.connections = ConnectionManager(db_path, functions=SQL_FUNCTIONS, read_only=read_only)
+        
+        # Search results, keyed on the index generation so writes invalidate them
+        self.result_cache = ResultCache(cache_size)
+        self.index_generation = 0
+        self._generation_lock = threading.Lock()
+        
+        # Writers run one at a time; searches share the index lock, which
+        # writers take exclusively only around in-place index updates
+        self._writer_lock = threading.Lock()
+        self.index_lock = ReadWriteLock()
         
-        # Initialize TF-IDF vectorizer
+        # Initialize database; a read-only store relies on its writer having done so
+        if not self.read_only:
+            self._init_database()
+        
+        # TF-IDF vectorizer configuration; each refit fits a clone of it
         self.vectorizer = TfidfVectorizer(
             max_features=1000,
             stop_words='english',
             ngram_range=(1, 2)
         )
         
-        # Load existing documents for vectorization
-        self._update_vectorizer()
+        # Fitted TF-IDF state, replaced wholesale by publishing a new snapshot.
+        # Searches never lock: they read the reference once and keep that snapshot
+        self.tfidf_index = TfidfIndex()
+        self._publish_lock = threading.Lock()
+        self._refit_lock = threading.Lock()
+        self._compaction_thread = None
+        
+        # Named shared-memory copy of the TF-IDF index: worker processes on
+        # one box attach a single published copy instead of each fitting their own
+        self.shared_index = SharedIndex(shared_index) if shared_index and scorer == 'tfidf' else None
+        self._attach_lock = threading.Lock()
+        self._deletes_seen = self.shared_index.latest_deletes() if self.shared_index is not None else 0
+        
+        # BM25 postings, maintained incrementally when the BM25 scorer is selected
+        self.bm25_index = None
+        self.bm25_passage_index = None
+        
+        # Stateless hashing vectorizer and hashed vector indexes for the fit-free 'hashing' scorer
+        self.hashing_vectorizer = HashingVectorizer(
+            n_features=2 ** 18,
+            stop_words='english',
+            ngram_range=(1, 2),
+            alternate_sign=False
+        )
+        
+        # In-memory weights of hashed vectors; int8 rows are widened to float16 on load,
+        # and TF-IDF rows read back from storage to float64
+        self.hashed_weight_dtype = np.float32 if vector_precision == 'float32' else np.float16
+        self.lsh_index = None
+        self.lsh_passage_index = None
+        
+        # MinHash bands over stored signatures, used by ingest to spot near-duplicates
+        self.minhash_index = None
+        if self.duplicates != 'off':
+            self._build_minhash_index()
+        
+        if self.scorer == 'bm25':
+            self._build_bm25_index()
+        elif self.scorer == 'hashing':
+            self._build_lsh_index()
+        elif self.scorer == 'tfidf':
+            # Attach a fresh shared index if another worker published one, else
+            # load the persisted index, refitting only if it is stale. A
+            # read-only store takes whatever index its writer shared or persisted
+            if self.shared_index is None or not self._attach_shared_index(fresh_only=not self.read_only):
+                self._load_index()
+                if self.shared_index is not None and not self.read_only:
+                    self._share_index()
+        
+        # Hashed document vectors the similar-documents graph is linked from,
+        # loaded by the first write; the hashing scorer's LSH tables hold them already
+        self.neighbor_index = None
+        if self.neighbors:
+            self._build_neighbor_graph()
     
     def _init_database(self):
         """Initialize SQLite database for document storage"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.get() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS documents (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,37 +187,290 @@ class VectorStore:
                     content TEXT NOT NULL,
                     document_type TEXT,
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    metadata TEXT
+                    metadata TEXT,
+                    content_codec TEXT NOT NULL DEFAULT 'none'
                 )
             ''')
             
+            # Rows stored before compression keep working as plain text
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(documents)')]
+            if 'content_codec' not in columns:
+                conn.execute("ALTER TABLE documents ADD COLUMN content_codec TEXT NOT NULL DEFAULT 'none'")
+            
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS document_vectors (
                     document_id INTEGER,
-                    vector_data TEXT,
+                    vector_data BLOB,
                     FOREIGN KEY (document_id) REFERENCES documents (id)
                 )
             ''')
             
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_documents_timestamp_id
+                ON documents (timestamp, id)
+            ''')
+            
+            # Serves search filters on document type and date range
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_documents_type_timestamp
+                ON documents (document_type, timestamp)
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_document_vectors_document_id
+                ON document_vectors (document_id)
+            ''')
+            
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS vectorizer_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            
+            # Documents deleted since the persisted TF-IDF index was fitted, so
+            # every store loading or sharing that index hides them too
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS index_tombstones (
+                    document_id INTEGER PRIMARY KEY
+                ) WITHOUT ROWID
+            ''')
+            
+            # Overlapping passages, stored as character offsets into the content
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS document_passages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document_id INTEGER NOT NULL,
+                    start_offset INTEGER NOT NULL,
+                    end_offset INTEGER NOT NULL,
+                    FOREIGN KEY (document_id) REFERENCES documents (id)
+                )
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_document_passages_document_id
+                ON document_passages (document_id)
+            ''')
+            
+            # Hashed vectors of documents and passages, computed once at ingest.
+            # Vectors are packed BLOBs; JSON text rows written before that still load
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS hashed_vectors (
+                    kind TEXT NOT NULL,
+                    item_id INTEGER NOT NULL,
+                    vector_data BLOB NOT NULL,
+                    PRIMARY KEY (kind, item_id)
+                )
+            ''')
+            
+            # MinHash signature of each document, and the earlier document it nearly duplicates
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS document_signatures (
+                    document_id INTEGER PRIMARY KEY,
+                    signature BLOB NOT NULL,
+                    duplicate_of INTEGER
+                )
+            ''')
+            
+            # Each document's nearest neighbours, read by similar_documents
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS document_neighbors (
+                    document_id INTEGER NOT NULL,
+                    neighbor_id INTEGER NOT NULL,
+                    similarity REAL NOT NULL,
+                    PRIMARY KEY (document_id, neighbor_id)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Finds the documents linking to one that is deleted
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_document_neighbors_neighbor_id
+                ON document_neighbors (neighbor_id)
+            ''')
+            
+            # Split documents stored before passages were introduced
+            for document_id, content in conn.execute(f'''
+                SELECT id, {CONTENT_SQL} FROM documents
+                WHERE NOT EXISTS (SELECT 1 FROM document_passages WHERE document_id = documents.id)
+            ''').fetchall():
+                self._insert_passages(conn, document_id, content)
+            
+            self._init_stats(conn)
+            
+            if self.scorer == 'fts5':
+                self._init_fts(conn)
+            
             conn.commit()
     
+    def _init_stats(self, conn):
+        """Create the per-type document counts, kept up to date by triggers"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_stats'"
+        ).fetchone()
+        
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS document_stats (
+                document_type TEXT,
+                document_count INTEGER NOT NULL
+            )
+        ''')
+        
+        # 'IS' matches NULL document types too, which a primary key would not
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS document_stats_insert AFTER INSERT ON documents BEGIN
+                INSERT INTO document_stats (document_type, document_count)
+                SELECT new.document_type, 0
+                WHERE NOT EXISTS (SELECT 1 FROM document_stats WHERE document_type IS new.document_type);
+                UPDATE document_stats SET document_count = document_count + 1
+                WHERE document_type IS new.document_type;
+            END
+        ''')
+        
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS document_stats_delete AFTER DELETE ON documents BEGIN
+                UPDATE document_stats SET document_count = document_count - 1
+                WHERE document_type IS old.document_type;
+                DELETE FROM document_stats WHERE document_count <= 0;
+            END
+        ''')
+        
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS document_stats_update AFTER UPDATE OF document_type ON documents
+            WHEN old.document_type IS NOT new.document_type BEGIN
+                UPDATE document_stats SET document_count = document_count - 1
+                WHERE document_type IS old.document_type;
+                DELETE FROM document_stats WHERE document_count <= 0;
+                INSERT INTO document_stats (document_type, document_count)
+                SELECT new.document_type, 0
+                WHERE NOT EXISTS (SELECT 1 FROM document_stats WHERE document_type IS new.document_type);
+                UPDATE document_stats SET document_count = document_count + 1
+                WHERE document_type IS new.document_type;
+            END
+        ''')
+        
+        # Count documents stored before the stats table existed
+        if not exists:
+            conn.execute('''
+                INSERT INTO document_stats (document_type, document_count)
+                SELECT document_type, COUNT(*) FROM documents GROUP BY document_type
+            ''')
+    
+    def _init_fts(self, conn):
+        """Create the FTS5 index over document content, kept in sync by triggers"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+        ).fetchone() is not None
+        
+        # FTS5 reads external content for snippets and rebuilds, so it goes through a decompressing view
+        conn.execute(f'''
+            CREATE VIEW IF NOT EXISTS documents_text AS
+            SELECT id, {CONTENT_SQL} AS content FROM documents
+        ''')
+        
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                content,
+                content='documents_text',
+                content_rowid='id',
+                tokenize='porter unicode61'
+            )
+        ''')
+        
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts (rowid, content) VALUES (new.id, {content_sql('new')});
+            END
+        ''')
+        
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, content)
+                VALUES ('delete', old.id, {content_sql('old')});
+            END
+        ''')
+        
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF content, content_codec ON documents BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, content)
+                VALUES ('delete', old.id, {content_sql('old')});
+                INSERT INTO documents_fts (rowid, content) VALUES (new.id, {content_sql('new')});
+            END
+        ''')
+        
+        # Index documents stored before full-text search was enabled
+        if not exists:
+            conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+    
     def add_document(self, filename: str, content: str, document_type: str = None, metadata: Dict = None) -> int:
-        """Add a document to the vector store"""
+        """Add a document to the vector store
+        
+        A near-duplicate of a stored document is flagged as such, or with
+        duplicates='skip' not stored at all, returning the stored one's ID.
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer_lock, self.connections.get() as conn:
+                signature = duplicate_of = None
+                if self.minhash_index is not None:
+                    signature = self.minhash_index.signature(content)
+                    duplicate_of = self._near_duplicate(signature)
+                    if duplicate_of is not None and self.duplicates == 'skip':
+                        self.logger.info(f"Document '{filename}' skipped as a near-duplicate of {duplicate_of}")
+                        return duplicate_of
+                    if duplicate_of is not None:
+                        self.logger.warning(f"Document '{filename}' is a near-duplicate of {duplicate_of}")
+                
                 cursor = conn.cursor()
                 
                 # Insert document
                 cursor.execute('''
-                    INSERT INTO documents (filename, content, document_type, metadata)
-                    VALUES (?, ?, ?, ?)
-                ''', (filename, content, document_type, json.dumps(metadata or {})))
+                    INSERT INTO documents (filename, content, content_codec, document_type, metadata)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (filename, compress_content(content, self.compression), self.compression,
+                      document_type, json.dumps(metadata or {})))
                 
                 document_id = cursor.lastrowid
+                passages = self._insert_passages(conn, document_id, content)
+                
+                if self.scorer == 'hashing' or self.neighbors:
+                    vectors = self._store_hashed_vectors(conn, 'document', [document_id], [content])
+                if self.scorer == 'hashing':
+                    passage_ids = [passage[0] for passage in passages]
+                    passage_vectors = self._store_hashed_vectors(
+                        conn, 'passage', passage_ids, [content[start:end] for _, start, end in passages]
+                    )
+                
+                if signature is not None:
+                    self._store_signatures(conn, [(document_id, signature, duplicate_of)])
+                
+                if not self.neighbors:
+                    self._mark_neighbor_graph_stale(conn)
+                
                 conn.commit()
                 
-                # Update vectorizer with new document
-                self._update_vectorizer()
+                if signature is not None:
+                    self.minhash_index.add(document_id, signature)
+                
+                # Update the index with the new document
+                if self.scorer == 'bm25':
+                    with self.index_lock.write():
+                        self.bm25_index.add(document_id, content)
+                        for passage_id, start, end in passages:
+                            self.bm25_passage_index.add(passage_id, content[start:end])
+                elif self.scorer == 'hashing':
+                    with self.index_lock.write():
+                        self.lsh_index.add_many([document_id], vectors)
+                        self.lsh_passage_index.add_many(passage_ids, passage_vectors)
+                elif self.scorer == 'tfidf':
+                    self._update_vectorizer()
+                
+                if self.neighbors:
+                    index = self._neighbor_vectors()
+                    if index is not self.lsh_index:
+                        index.add_many([document_id], vectors)
+                    self._link_documents(conn, [document_id])
+                    conn.commit()
+                
+                self._invalidate_results()
                 
                 self.logger.info(f"Document '{filename}' added with ID {document_id}")
                 return document_id
@@ -80,84 +479,819 @@ class VectorStore:
             self.logger.error(f"Error adding document: {str(e)}")
             return -1
     
-    def search_documents(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Search for relevant documents using TF-IDF similarity"""
+    def add_documents(self, documents: Iterable[Dict], batch_size: int = 500, reindex: str = 'end') -> Dict:
+        """Add many documents with batched inserts and a deferred index update
+        
+        Each document is a dict with 'filename', 'content' and optionally
+        'document_type' and 'metadata'. With reindex='end' the whole import
+        is one transaction and the index is updated once afterwards; with
+        reindex='batch' every batch is committed and indexed on its own, so
+        searches see the import progress. Near-duplicates are reported as
+        {input position: ID of the earlier document} under 'duplicates'.
+        """
+        if reindex not in ('end', 'batch'):
+            raise ValueError(f"Unknown reindex mode '{reindex}', expected 'end' or 'batch'")
+        
+        with self._writer_lock:
+            return self._add_documents(iter(documents), batch_size, reindex)
+    
+    def _add_documents(self, documents: Iterator[Dict], batch_size: int, reindex: str) -> Dict:
+        """Run a bulk import while holding the writer lock"""
+        report = {'ids': [], 'batches': [], 'duplicates': {}, 'index_seconds': 0.0}
+        started = time.perf_counter()
+        inserted = []
+        
+        # Signatures of this import, so duplicates within it are caught before they are indexed
+        seen = MinHashIndex() if self.minhash_index is not None else None
+        
         try:
-            # Get all documents
-            documents = self.list_documents()
+            with self.connections.get() as conn:
+                while True:
+                    batch = list(islice(documents, batch_size))
+                    if not batch:
+                        break
+                    
+                    batch_started = time.perf_counter()
+                    ids, batch_inserted, duplicates = self._insert_batch(conn, batch, seen)
+                    timing = {'documents': len(batch_inserted), 'insert_seconds': time.perf_counter() - batch_started}
+                    
+                    if reindex == 'batch':
+                        conn.commit()
+                        index_started = time.perf_counter()
+                        self._index_new_documents(batch_inserted)
+                        timing['index_seconds'] = time.perf_counter() - index_started
+                    
+                    for position, duplicate_of in duplicates.items():
+                        report['duplicates'][len(report['ids']) + position] = duplicate_of
+                    report['ids'].extend(ids)
+                    report['batches'].append(timing)
+                    inserted.extend(batch_inserted)
+                    
+        except Exception as e:
+            self.logger.error(f"Error adding documents: {str(e)}")
+            if reindex == 'end':
+                # The single transaction was rolled back
+                report['ids'] = []
+                report['batches'] = []
+                report['duplicates'] = {}
+                inserted = []
+        
+        if reindex == 'end' and inserted:
+            index_started = time.perf_counter()
+            self._index_new_documents(inserted)
+            report['index_seconds'] = time.perf_counter() - index_started
+        elif reindex == 'batch':
+            report['index_seconds'] = sum(timing['index_seconds'] for timing in report['batches'])
+        
+        report['total_seconds'] = time.perf_counter() - started
+        self.logger.info(f"Added {len(report['ids'])} documents in {len(report['batches'])} batches")
+        return report
+    
+    def _insert_batch(self, conn, batch: List[Dict],
+                      seen: MinHashIndex = None) -> Tuple[List[int], List[int], Dict[int, int]]:
+        """Insert a batch of documents with executemany
+        
+        Returns every document's ID in input order, the IDs of the rows
+        inserted and the near-duplicates found, as {position in batch: ID of
+        the earlier document}. A skipped near-duplicate gets the earlier ID.
+        """
+        signatures = {}
+        duplicates = {}
+        if seen is not None:
+            for position, doc in enumerate(batch):
+                signature = self.minhash_index.signature(doc['content'])
+                duplicate_of = self._near_duplicate(signature, seen)
+                if duplicate_of is not None:
+                    duplicates[position] = duplicate_of
+                    if self.duplicates == 'skip':
+                        continue
+                
+                # Documents of this batch have no ID yet, so a negative position stands in
+                signatures[position] = signature
+                seen.add(-position - 1, signature)
+        
+        kept = [position for position in range(len(batch)) if position in signatures or seen is None]
+        if not kept:
+            # Every document was a skipped near-duplicate of a stored one
+            return [duplicates[position] for position in range(len(batch))], [], duplicates
+        
+        conn.executemany('''
+            INSERT INTO documents (filename, content, content_codec, document_type, metadata)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (doc['filename'], compress_content(doc['content'], self.compression), self.compression,
+             doc.get('document_type'), json.dumps(doc.get('metadata') or {}))
+            for doc in (batch[position] for position in kept)
+        ])
+        
+        # The open write transaction holds the database lock, so the batch
+        # received the last len(kept) AUTOINCREMENT values
+        last_id = self._last_insert_id(conn, 'documents')
+        document_ids = list(range(last_id - len(kept) + 1, last_id + 1))
+        ids = dict(zip(kept, document_ids))
+        
+        passages = []
+        for document_id, position in zip(document_ids, kept):
+            content = batch[position]['content']
+            for passage_id, start, end in self._insert_passages(conn, document_id, content):
+                passages.append((passage_id, content[start:end]))
+        
+        if self.scorer == 'hashing' or self.neighbors:
+            self._store_hashed_vectors(conn, 'document', document_ids, [batch[position]['content'] for position in kept])
+        if self.scorer == 'hashing' and passages:
+            self._store_hashed_vectors(conn, 'passage', [passage[0] for passage in passages],
+                                       [passage[1] for passage in passages])
+        
+        if signatures:
+            duplicates = {
+                position: ids[-duplicate_of - 1] if duplicate_of < 0 else duplicate_of
+                for position, duplicate_of in duplicates.items()
+            }
+            for position, signature in signatures.items():
+                seen.remove(-position - 1)
+                seen.add(ids[position], signature)
+            self._store_signatures(conn, [
+                (ids[position], signature, duplicates.get(position)) for position, signature in signatures.items()
+            ])
+        
+        if not self.neighbors:
+            self._mark_neighbor_graph_stale(conn)
+        
+        return [ids.get(position, duplicates.get(position)) for position in range(len(batch))], document_ids, duplicates
+    
+    def _store_hashed_vectors(self, conn, kind: str, item_ids: List[int], texts: List[str]):
+        """Vectorize texts once with the stateless hashing vectorizer and persist the rows"""
+        matrix = self.hashing_vectorizer.transform(texts)
+        conn.executemany('''
+            INSERT OR REPLACE INTO hashed_vectors (kind, item_id, vector_data) VALUES (?, ?, ?)
+        ''', [(kind, item_id, encoded) for item_id, encoded in zip(item_ids, self._encode_vectors(matrix))])
+        return matrix
+    
+    def _near_duplicate(self, signature: np.ndarray, seen: MinHashIndex = None) -> Optional[int]:
+        """ID of the stored document most similar to a signature, if any is similar enough"""
+        matches = self.minhash_index.query(signature, self.duplicate_threshold)
+        if seen is not None:
+            matches += seen.query(signature, self.duplicate_threshold)
+        return max(matches, key=lambda match: match[1])[0] if matches else None
+    
+    def _store_signatures(self, conn, rows: List[Tuple[int, np.ndarray, Optional[int]]]):
+        """Persist (document_id, signature, duplicate_of) rows"""
+        conn.executemany('''
+            INSERT OR REPLACE INTO document_signatures (document_id, signature, duplicate_of) VALUES (?, ?, ?)
+        ''', [(document_id, signature.astype('<u4').tobytes(), duplicate_of)
+              for document_id, signature, duplicate_of in rows])
+    
+    def _load_signatures(self, where: str = '', params: Tuple = ()):
+        """Add stored signatures selected by a WHERE clause to the MinHash index"""
+        rows = self.connections.get().execute(
+            f'SELECT document_id, signature FROM document_signatures {where}', params
+        ).fetchall()
+        for document_id, signature in rows:
+            self.minhash_index.add(document_id, np.frombuffer(signature, dtype='<u4'))
+    
+    def _build_minhash_index(self):
+        """Load stored signatures, computing those of documents stored before duplicate detection"""
+        self.minhash_index = MinHashIndex()
+        
+        try:
+            with self.connections.get() as conn:
+                rows = conn.execute(f'''
+                    SELECT id, {CONTENT_SQL} FROM documents
+                    WHERE NOT EXISTS (SELECT 1 FROM document_signatures WHERE document_id = documents.id)
+                ''').fetchall()
+                if rows:
+                    self._store_signatures(conn, [
+                        (document_id, self.minhash_index.signature(content), None) for document_id, content in rows
+                    ])
+                    conn.commit()
             
-            if not documents:
-                return []
+            self._load_signatures()
             
-            # Prepare document texts
-            doc_texts = [doc['content'] for doc in documents]
+        except Exception as e:
+            self.logger.error(f"Error building MinHash index: {str(e)}")
+    
+    def _last_insert_id(self, conn, table: str) -> int:
+        """Get the last AUTOINCREMENT value handed out for a table"""
+        row = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+        return row[0] if row else 0
+    
+    def _split_passages(self, content: str) -> List[Tuple[int, int]]:
+        """Split content into overlapping word windows, as (start, end) offsets"""
+        words = [match.span() for match in re.finditer(r'\S+', content)]
+        if not words:
+            return [(0, len(content))]
+        
+        passages = []
+        step = self.passage_words - self.passage_overlap
+        for first in range(0, len(words), step):
+            window = words[first:first + self.passage_words]
+            passages.append((window[0][0], window[-1][1]))
+            if first + self.passage_words >= len(words):
+                break
+        
+        return passages
+    
+    def _insert_passages(self, conn, document_id: int, content: str) -> List[Tuple[int, int, int]]:
+        """Store a document's passages, returning (passage_id, start, end) tuples"""
+        spans = self._split_passages(content)
+        conn.executemany('''
+            INSERT INTO document_passages (document_id, start_offset, end_offset)
+            VALUES (?, ?, ?)
+        ''', [(document_id, start, end) for start, end in spans])
+        
+        last_id = self._last_insert_id(conn, 'document_passages')
+        first_id = last_id - len(spans) + 1
+        return [(first_id + i, start, end) for i, (start, end) in enumerate(spans)]
+    
+    def _index_new_documents(self, document_ids: List[int]):
+        """Bring the index up to date after documents were inserted"""
+        if not document_ids:
+            return
+        
+        if self.minhash_index is not None:
+            self._load_signatures('WHERE document_id BETWEEN ? AND ?', (min(document_ids), max(document_ids)))
+        
+        if self.scorer == 'bm25':
+            conn = self.connections.get()
+            documents = conn.execute(f'SELECT id, {CONTENT_SQL} FROM documents WHERE id BETWEEN ? AND ?',
+                                     (min(document_ids), max(document_ids))).fetchall()
+            passages = conn.execute(f'''
+                SELECT p.id, {PASSAGE_TEXT_SQL}
+                FROM document_passages p JOIN documents d ON d.id = p.document_id
+                WHERE p.document_id BETWEEN ? AND ?
+            ''', (min(document_ids), max(document_ids))).fetchall()
             
-            # Add query to the corpus and vectorize
-            all_texts = doc_texts + [query]
+            with self.index_lock.write():
+                for document_id, content in documents:
+                    self.bm25_index.add(document_id, content)
+                for passage_id, text in passages:
+                    self.bm25_passage_index.add(passage_id, text)
+        elif self.scorer == 'hashing':
+            self._load_hashed_vectors(self.lsh_index, '''
+                SELECT item_id, vector_data FROM hashed_vectors
+                WHERE kind = 'document' AND item_id BETWEEN ? AND ?
+            ''', (min(document_ids), max(document_ids)))
+            self._load_hashed_vectors(self.lsh_passage_index, '''
+                SELECT h.item_id, h.vector_data
+                FROM hashed_vectors h JOIN document_passages p ON p.id = h.item_id
+                WHERE h.kind = 'passage' AND p.document_id BETWEEN ? AND ?
+            ''', (min(document_ids), max(document_ids)))
+        elif self.scorer == 'tfidf':
+            self._update_vectorizer()
+        
+        if self.neighbors:
+            index = self._neighbor_vectors()
+            if index is not self.lsh_index:
+                self._load_hashed_vectors(index, '''
+                    SELECT item_id, vector_data FROM hashed_vectors
+                    WHERE kind = 'document' AND item_id BETWEEN ? AND ?
+                ''', (min(document_ids), max(document_ids)))
+            with self.connections.get() as conn:
+                self._link_documents(conn, document_ids)
+                conn.commit()
+        
+        self._invalidate_results()
+    
+    def search_documents(self, query: str, top_k: int = 5, document_type: str = None,
+                         since: Any = None, until: Any = None, metadata: Dict = None) -> List[Dict]:
+        """Search for relevant documents using the configured scorer
+        
+        Filters on document_type, a [since, until) timestamp range and
+        metadata key/value pairs are evaluated in SQL before scoring, so only
+        matching documents reach the vector math.
+        
+        Hits hold the id, filename, document_type, similarity and a snippet
+        with the matched terms marked; get_document loads the full content.
+        """
+        filters = self._search_filters(document_type, since, until, metadata)
+        cache_key = self._cache_key('documents', query, top_k, filters)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return [dict(doc) for doc in cached]
+        
+        try:
+            candidates = self._filter_document_ids(filters) if filters and self.scorer != 'fts5' else None
             
-            # Fit and transform the texts
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
+            with self.index_lock.read():
+                if candidates is not None and len(candidates) == 0:
+                    document_ids, similarities = [], []
+                elif self.scorer == 'bm25':
+                    document_ids, similarities = self.bm25_index.search(query, top_k, candidates)
+                elif self.scorer == 'fts5':
+                    document_ids, similarities = self._search_fts(query, top_k, filters)
+                elif self.scorer == 'hashing':
+                    document_ids, similarities = self._search_lsh(self.lsh_index, query, top_k, candidates)
+                else:
+                    document_ids, similarities = self._search_tfidf(query, top_k, candidates)
             
-            # Calculate similarity between query and documents
-            query_vector = tfidf_matrix[-1]  # Last vector is the query
-            doc_vectors = tfidf_matrix[:-1]  # All others are documents
+            document_ids = [int(document_id) for document_id in document_ids]
+            results = self._rank_documents(document_ids, similarities, self._get_hits(document_ids),
+                                           self._snippets(query, document_ids))
             
-            # Calculate cosine similarity
-            similarities = cosine_similarity(query_vector, doc_vectors).flatten()
+            self.result_cache.put(cache_key, results)
+            return [dict(doc) for doc in results]
             
-            # Get top-k most similar documents
-            top_indices = np.argsort(similarities)[::-1][:top_k]
+        except Exception as e:
+            self.logger.error(f"Error searching documents: {str(e)}")
+            return []
+    
+    def _invalidate_results(self):
+        """Move to a new index generation, so results cached before a write are never served"""
+        with self._generation_lock:
+            self.index_generation += 1
+    
+    def _cache_key(self, kind: str, query: str, top_k: int, filters: Tuple = ()) -> Tuple:
+        """Build a result cache key from the normalized query, filters and index generation
+        
+        The latest shared version and delete count are part of the key, so
+        a write or delete by another store misses the cache and is picked up.
+        """
+        shared_version = None
+        if self.shared_index is not None:
+            shared_version = (self.shared_index.latest_version(), self.shared_index.latest_deletes())
+        return (kind, ' '.join(query.lower().split()), top_k, filters, self.index_generation, shared_version)
+    
+    def _search_filters(self, document_type: str = None, since: Any = None, until: Any = None,
+                        metadata: Dict = None) -> Tuple[Tuple[str, Tuple], ...]:
+        """Turn search filter arguments into hashable (SQL condition, parameters) pairs"""
+        filters = []
+        if document_type is not None:
+            filters.append(('document_type = ?', (document_type,)))
+        if since is not None:
+            filters.append(('timestamp >= ?', (self._timestamp(since),)))
+        if until is not None:
+            filters.append(('timestamp < ?', (self._timestamp(until),)))
+        
+        for key, value in sorted((metadata or {}).items()):
+            if isinstance(value, (list, dict)):
+                # json_extract returns nested values as minified JSON text
+                value = json.dumps(value, separators=(',', ':'))
+            filters.append(('json_extract(metadata, ?) = ?', (self._json_path(key), value)))
+        
+        return tuple(filters)
+    
+    def _timestamp(self, value: Any) -> str:
+        """Format a filter bound like the stored CURRENT_TIMESTAMP values"""
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(value, date):
+            return value.strftime('%Y-%m-%d')
+        return str(value)
+    
+    def _json_path(self, key: str) -> str:
+        """JSON path to a top-level metadata key, quoted so dots and brackets are literal"""
+        if '"' in key:
+            # SQLite JSON paths cannot escape a double quote inside a quoted label
+            raise ValueError(f"Unsupported metadata filter key: {key!r}")
+        return f'$."{key}"'
+    
+    def _filter_sql(self, filters: Tuple) -> Tuple[str, List]:
+        """Combine filters into a WHERE condition over the documents table"""
+        return ' AND '.join(condition for condition, _ in filters), [param for _, params in filters for param in params]
+    
+    def _filter_document_ids(self, filters: Tuple) -> np.ndarray:
+        """Get the ids of documents passing the filters, using the documents indexes"""
+        condition, params = self._filter_sql(filters)
+        rows = self.connections.get().execute(f'SELECT id FROM documents WHERE {condition} ORDER BY id', params)
+        return np.array([row[0] for row in rows], dtype=np.int64)
+    
+    def _filter_passage_ids(self, filters: Tuple) -> np.ndarray:
+        """Get the ids of passages whose document passes the filters"""
+        condition, params = self._filter_sql(filters)
+        rows = self.connections.get().execute(f'''
+            SELECT id FROM document_passages
+            WHERE document_id IN (SELECT id FROM documents WHERE {condition})
+            ORDER BY id
+        ''', params)
+        return np.array([row[0] for row in rows], dtype=np.int64)
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Get result cache hit, miss and eviction counters"""
+        info = self.result_cache.info()
+        info['generation'] = self.index_generation
+        return info
+    
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """Search for several queries at once, returning ranked results per query"""
+        try:
+            with self.index_lock.read():
+                if self.scorer == 'tfidf':
+                    ranked = self._search_tfidf_many(queries, top_k)
+                elif self.scorer == 'bm25':
+                    ranked = [self.bm25_index.search(query, top_k) for query in queries]
+                elif self.scorer == 'hashing':
+                    ranked = [self._search_lsh(self.lsh_index, query, top_k) for query in queries]
+                else:
+                    ranked = [self._search_fts(query, top_k) for query in queries]
             
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:  # Minimum similarity threshold
-                    doc = documents[idx].copy()
-                    doc['similarity'] = float(similarities[idx])
-                    results.append(doc)
+            # Fetch every matched document once for the whole batch
+            ranked = [([int(document_id) for document_id in ids], similarities) for ids, similarities in ranked]
+            hits = self._get_hits(sorted({document_id for ids, _ in ranked for document_id in ids}))
             
-            return results
+            return [
+                self._rank_documents(ids, similarities, hits, self._snippets(query, ids))
+                for query, (ids, similarities) in zip(queries, ranked)
+            ]
             
         except Exception as e:
             self.logger.error(f"Error searching documents: {str(e)}")
+            return [[] for _ in queries]
+    
+    def search_passages(self, query: str, top_k: int = 5, document_type: str = None,
+                        since: Any = None, until: Any = None, metadata: Dict = None) -> List[Dict]:
+        """Search for the best-matching passages, each with its parent document id
+        
+        Takes the same document filters as search_documents.
+        """
+        filters = self._search_filters(document_type, since, until, metadata)
+        cache_key = self._cache_key('passages', query, top_k, filters)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return [dict(passage) for passage in cached]
+        
+        try:
+            if self.scorer == 'fts5':
+                results = self._search_fts_passages(query, top_k, filters)
+            else:
+                if not filters:
+                    candidates = None
+                elif self.scorer == 'tfidf':
+                    # The passage index knows each passage's document, so filter by document id
+                    candidates = self._filter_document_ids(filters)
+                else:
+                    candidates = self._filter_passage_ids(filters)
+                
+                passage_ids, similarities = self._rank_passages(query, top_k, candidates)
+                passages = self._get_passages([int(passage_id) for passage_id in passage_ids])
+                
+                results = []
+                for passage_id, similarity in zip(passage_ids, similarities):
+                    passage = passages.get(int(passage_id))
+                    if passage:
+                        passage['similarity'] = float(similarity)
+                        results.append(passage)
+            
+            self.result_cache.put(cache_key, results)
+            return [dict(passage) for passage in results]
+            
+        except Exception as e:
+            self.logger.error(f"Error searching passages: {str(e)}")
+            return []
+    
+    def similar_documents(self, document_id: int, k: int = 5) -> List[Dict]:
+        """Get up to k documents most similar to a stored one, best first
+        
+        Reads the precomputed neighbour graph, which is only kept by stores
+        opened with neighbors > 0, so at most that many are returned. Hits hold the id, filename,
+        document_type and the cosine similarity of the hashed vectors.
+        """
+        try:
+            rows = self.connections.get().execute('''
+                SELECT d.id, d.filename, d.document_type, n.similarity
+                FROM document_neighbors n JOIN documents d ON d.id = n.neighbor_id
+                WHERE n.document_id = ?
+                ORDER BY n.similarity DESC, n.neighbor_id
+                LIMIT ?
+            ''', (document_id, k)).fetchall()
+            
+            return [{'id': row[0], 'filename': row[1], 'document_type': row[2], 'similarity': row[3]} for row in rows]
+            
+        except Exception as e:
+            self.logger.error(f"Error finding documents similar to {document_id}: {str(e)}")
             return []
     
+    def _rank_passages(self, query: str, top_k: int, candidates: np.ndarray = None):
+        """Rank passages with the configured scorer; candidates are document ids for TF-IDF, else passage ids"""
+        with self.index_lock.read():
+            if candidates is not None and len(candidates) == 0:
+                return [], []
+            if self.scorer == 'bm25':
+                return self.bm25_passage_index.search(query, top_k, candidates)
+            if self.scorer == 'hashing':
+                return self._search_lsh(self.lsh_passage_index, query, top_k, candidates)
+            return self._search_tfidf_passages(query, top_k, candidates)
+    
+    def _snippets(self, query: str, document_ids: List[int]) -> Dict[int, str]:
+        """Highlighted snippets of matched documents, cut from their best-matching passage
+        
+        Only that passage is read from the database, so the cost of a hit
+        does not grow with the size of its document.
+        """
+        if not document_ids:
+            return {}
+        
+        if self.scorer == 'fts5':
+            texts = self._fts_snippets(query, document_ids)
+        else:
+            texts = self._passage_texts(query, document_ids)
+        
+        terms = self._query_terms(query)
+        return {document_id: highlight(text or '', terms, self.SNIPPET_CHARS) for document_id, text in texts.items()}
+    
+    def _passage_texts(self, query: str, document_ids: List[int]) -> Dict[int, str]:
+        """Text of each document's best-scoring passage for the query, or of its first passage"""
+        placeholders = ','.join('?' * len(document_ids))
+        rows = self.connections.get().execute(f'''
+            SELECT id, document_id FROM document_passages WHERE document_id IN ({placeholders}) ORDER BY id
+        ''', document_ids).fetchall()
+        passage_documents = dict(rows)
+        
+        candidates = np.array(document_ids if self.scorer == 'tfidf' else list(passage_documents), dtype=np.int64)
+        passage_ids, _ = self._rank_passages(query, len(rows), candidates)
+        
+        best = {}
+        for passage_id in passage_ids:
+            document_id = passage_documents.get(int(passage_id))
+            if document_id is not None:
+                best.setdefault(document_id, int(passage_id))
+        for passage_id, document_id in rows:
+            best.setdefault(document_id, passage_id)
+        
+        passages = self._get_passages(list(best.values()))
+        return {
+            document_id: passages[passage_id]['text']
+            for document_id, passage_id in best.items() if passage_id in passages
+        }
+    
+    def _get_passages(self, passage_ids: List[int]) -> Dict[int, Dict]:
+        """Get passage text and parent document details, cut from the content in SQL"""
+        if not passage_ids:
+            return {}
+        
+        placeholders = ','.join('?' * len(passage_ids))
+        cursor = self.connections.get().execute(f'''
+            SELECT p.id, p.document_id, d.filename, d.document_type, p.start_offset, p.end_offset,
+                   {PASSAGE_TEXT_SQL}
+            FROM document_passages p JOIN documents d ON d.id = p.document_id
+            WHERE p.id IN ({placeholders})
+        ''', passage_ids)
+        
+        return {
+            row[0]: {
+                'passage_id': row[0],
+                'document_id': row[1],
+                'filename': row[2],
+                'document_type': row[3],
+                'start': row[4],
+                'end': row[5],
+                'text': row[6]
+            }
+            for row in cursor.fetchall()
+        }
+    
+    def _rank_documents(self, document_ids: List[int], similarities, hits: Dict[int, Dict],
+                        snippets: Dict[int, str]) -> List[Dict]:
+        """Build search results from ranked ids, their fetched hit details and snippets"""
+        results = []
+        for document_id, similarity in zip(document_ids, similarities):
+            hit = hits.get(document_id)
+            if hit:
+                hit = dict(hit)
+                hit['similarity'] = float(similarity)
+                hit['snippet'] = snippets.get(document_id, '')
+                results.append(hit)
+        
+        return results
+    
+    def _search_tfidf(self, query: str, top_k: int, candidates: np.ndarray = None):
+        """Rank documents by TF-IDF cosine similarity, returning ids and scores"""
+        index = self._current_tfidf_index()
+        if index.is_empty:
+            return [], []
+        
+        # Vectorize the query against the fitted vocabulary
+        query_vector = index.vectorizer.transform([query])
+        
+        if query_vector.nnz == 0:
+            return [], []
+        
+        # Document rows are L2-normalized, so accumulating the query's
+        # posting lists gives the cosine similarity of each candidate
+        allowed = index.doc_live
+        if candidates is not None:
+            in_candidates = np.isin(index.doc_ids, candidates)
+            allowed = in_candidates if allowed is None else allowed & in_candidates
+        
+        top_indices, similarities = index.inverted_index.search(
+            query_vector.indices, query_vector.data, top_k,
+            min_score=0.1,  # Minimum similarity threshold
+            allowed=allowed
+        )
+        
+        return index.doc_ids[top_indices], similarities
+    
+    def _search_tfidf_passages(self, query: str, top_k: int, document_ids: np.ndarray = None):
+        """Rank passages by TF-IDF cosine similarity, optionally only those of some documents"""
+        index = self._current_tfidf_index()
+        if index.passage_index is None:
+            return [], []
+        
+        query_vector = index.vectorizer.transform([query])
+        
+        if query_vector.nnz == 0:
+            return [], []
+        
+        allowed = index.passage_live
+        if document_ids is not None:
+            in_documents = np.isin(index.passage_document_ids, document_ids)
+            allowed = in_documents if allowed is None else allowed & in_documents
+        
+        top_indices, similarities = index.passage_index.search(
+            query_vector.indices, query_vector.data, top_k,
+            min_score=0.1,  # Minimum similarity threshold
+            allowed=allowed
+        )
+        
+        return index.passage_ids[top_indices], similarities
+    
+    def _search_lsh(self, index: LSHIndex, query: str, top_k: int, candidates: np.ndarray = None):
+        """Rank hashed vectors exactly by cosine similarity to the query"""
+        query_vector = self.hashing_vectorizer.transform([query])
+        
+        if query_vector.nnz == 0:
+            return [], []
+        
+        return index.search(
+            query_vector, top_k,
+            min_score=0.1,  # Minimum similarity threshold
+            allowed=None if candidates is None else candidates.tolist()
+        )
+    
+    def _search_tfidf_many(self, queries: List[str], top_k: int):
+        """Rank documents for a batch of queries with one sparse matrix product"""
+        index = self._current_tfidf_index()
+        if index.is_empty or not queries:
+            return [([], []) for _ in queries]
+        
+        # One transform and one product score every query against every document
+        query_matrix = index.vectorizer.transform(queries)
+        similarities = (query_matrix @ index.doc_matrix.T).tocsr()
+        live = index.doc_live
+        
+        ranked = []
+        for row in range(len(queries)):
+            start, end = similarities.indptr[row], similarities.indptr[row + 1]
+            positions, scores = similarities.indices[start:end], similarities.data[start:end]
+            if live is not None:
+                positions, scores = positions[live[positions]], scores[live[positions]]
+            top_indices, scores = select_top_k(
+                positions, scores, top_k,
+                min_score=0.1  # Minimum similarity threshold
+            )
+            ranked.append((index.doc_ids[top_indices], scores))
+        
+        return ranked
+    
+    def _query_terms(self, query: str) -> set:
+        """Lowercased query words, without stop words"""
+        stop_words = self.vectorizer.get_stop_words()
+        return {term for term in self.vectorizer.build_tokenizer()(query.lower()) if term not in stop_words}
+    
+    def _fts_match_expression(self, query: str) -> Optional[str]:
+        """Turn a free-text query into an FTS5 MATCH expression over its terms"""
+        terms = self._query_terms(query)
+        
+        if not terms:
+            return None
+        
+        # Quote each term so user input is never parsed as FTS5 query syntax
+        return ' OR '.join('"' + term.replace('"', '""') + '"' for term in sorted(terms))
+    
+    def _search_fts(self, query: str, top_k: int, filters: Tuple = ()):
+        """Rank documents with SQLite FTS5 bm25(), returning ids and scores"""
+        match = self._fts_match_expression(query)
+        
+        if match is None or top_k <= 0:
+            return [], []
+        
+        condition, params = self._filter_sql(filters)
+        if condition:
+            condition = f"AND rowid IN (SELECT id FROM documents WHERE {condition})"
+        
+        with self.connections.get() as conn:
+            rows = conn.execute(f'''
+                SELECT rowid, bm25(documents_fts) AS rank
+                FROM documents_fts
+                WHERE documents_fts MATCH ? {condition}
+                ORDER BY rank
+                LIMIT ?
+            ''', [match] + params + [top_k]).fetchall()
+        
+        # bm25() is lower-is-better, so negate it into a similarity
+        return [row[0] for row in rows], [-row[1] for row in rows]
+    
+    def _search_fts_passages(self, query: str, top_k: int, filters: Tuple = ()) -> List[Dict]:
+        """Find passages with FTS5, using snippet() to cut the best-matching fragment"""
+        match = self._fts_match_expression(query)
+        
+        if match is None or top_k <= 0:
+            return []
+        
+        condition, params = self._filter_sql(filters)
+        if condition:
+            condition = f"AND f.rowid IN (SELECT id FROM documents WHERE {condition})"
+        
+        rows = self.connections.get().execute(f'''
+            SELECT f.rowid, d.filename, d.document_type,
+                   snippet(documents_fts, 0, '', '', ' ... ', ?), bm25(documents_fts) AS rank
+            FROM documents_fts f JOIN documents d ON d.id = f.rowid
+            WHERE documents_fts MATCH ? {condition}
+            ORDER BY rank
+            LIMIT ?
+        ''', [min(self.passage_words, 64), match] + params + [top_k]).fetchall()
+        
+        return [{
+            'passage_id': None,
+            'document_id': row[0],
+            'filename': row[1],
+            'document_type': row[2],
+            'start': None,
+            'end': None,
+            'text': row[3],
+            'similarity': -row[4]
+        } for row in rows]
+    
+    def _fts_snippets(self, query: str, document_ids: List[int]) -> Dict[int, str]:
+        """Best-matching fragment of each document, cut by FTS5 snippet()"""
+        match = self._fts_match_expression(query)
+        if match is None:
+            return {}
+        
+        placeholders = ','.join('?' * len(document_ids))
+        rows = self.connections.get().execute(f'''
+            SELECT rowid, snippet(documents_fts, 0, '', '', '', ?)
+            FROM documents_fts
+            WHERE documents_fts MATCH ? AND rowid IN ({placeholders})
+        ''', [min(self.passage_words, 64), match] + document_ids).fetchall()
+        return dict(rows)
+    
     def list_documents(self) -> List[Dict]:
         """List all documents in the store"""
+        return list(self.iter_documents())
+    
+    def iter_documents(self, columns: List[str] = None, preview_chars: int = None,
+                       after: Optional[Tuple[str, int]] = None, limit: int = None,
+                       fetch_size: int = 100) -> Iterator[Dict]:
+        """Lazily iterate documents, newest first, reading only the requested columns
+        
+        'id' and 'timestamp' are always included so the last document seen
+        can be passed back as after=(timestamp, id) to fetch the next page.
+        With preview_chars, a 'preview' field holds the start of the content,
+        cut in SQL so the full text is never loaded or decompressed.
+        """
+        columns = list(columns or self.DOCUMENT_COLUMNS)
+        unknown = set(columns) - set(self.DOCUMENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown document columns: {sorted(unknown)}")
+        
+        selected = ['id', 'timestamp'] + [column for column in columns if column not in ('id', 'timestamp')]
+        expressions = [CONTENT_SQL if column == 'content' else column for column in selected]
+        params = []
+        if preview_chars is not None:
+            selected.append('preview')
+            # The length appears in both branches of the expression
+            expressions.append(content_substr_sql(None, '1', '?'))
+            params.extend([preview_chars, preview_chars])
+        
+        query = f"SELECT {', '.join(expressions)} FROM documents"
+        if after is not None:
+            # Keyset pagination: continue strictly after the given (timestamp, id)
+            query += ' WHERE (timestamp, id) < (?, ?)'
+            params.extend(after)
+        query += ' ORDER BY timestamp DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        return self._iter_rows(query, params, selected, fetch_size)
+    
+    def _iter_rows(self, query: str, params: List, columns: List[str], fetch_size: int) -> Iterator[Dict]:
+        """Stream document rows in bounded fetchmany chunks"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, filename, content, document_type, timestamp, metadata
-                    FROM documents
-                    ORDER BY timestamp DESC
-                ''')
-                
-                documents = []
-                for row in cursor.fetchall():
-                    doc = {
-                        'id': row[0],
-                        'filename': row[1],
-                        'content': row[2],
-                        'document_type': row[3],
-                        'timestamp': row[4],
-                        'metadata': json.loads(row[5]) if row[5] else {}
-                    }
-                    documents.append(doc)
-                
-                return documents
+            cursor = self.connections.get().execute(query, params)
+            
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
                 
+                for row in rows:
+                    doc = dict(zip(columns, row))
+                    if 'metadata' in doc:
+                        doc['metadata'] = json.loads(doc['metadata']) if doc['metadata'] else {}
+                    yield doc
+                    
         except Exception as e:
             self.logger.error(f"Error listing documents: {str(e)}")
-            return []
     
     def get_document(self, document_id: int) -> Dict:
         """Get a specific document by ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.get() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, filename, content, document_type, timestamp, metadata
-                    FROM documents
+                cursor.execute(f'''
+                    SELECT id, filename, {CONTENT_SQL}, document_type, timestamp, metadata, s.duplicate_of
+                    FROM documents LEFT JOIN document_signatures s ON s.document_id = documents.id
                     WHERE id = ?
                 ''', (document_id,))
                 
@@ -169,7 +1303,8 @@ class VectorStore:
                         'content': row[2],
                         'document_type': row[3],
                         'timestamp': row[4],
-                        'metadata': json.loads(row[5]) if row[5] else {}
+                        'metadata': json.loads(row[5]) if row[5] else {},
+                        'duplicate_of': row[6]
                     }
                 
                 return {}
@@ -178,20 +1313,92 @@ class VectorStore:
             self.logger.error(f"Error getting document {document_id}: {str(e)}")
             return {}
     
+    def _get_hits(self, document_ids: List[int]) -> Dict[int, Dict]:
+        """Get the id, filename and type of several documents in a single query, leaving content unread"""
+        if not document_ids:
+            return {}
+        
+        with self.connections.get() as conn:
+            placeholders = ','.join('?' * len(document_ids))
+            cursor = conn.execute(f'''
+                SELECT id, filename, document_type
+                FROM documents
+                WHERE id IN ({placeholders})
+            ''', document_ids)
+            
+            return {
+                row[0]: {
+                    'id': row[0],
+                    'filename': row[1],
+                    'document_type': row[2]
+                }
+                for row in cursor.fetchall()
+            }
+    
     def delete_document(self, document_id: int) -> bool:
         """Delete a document from the store"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer_lock, self.connections.get() as conn:
                 cursor = conn.cursor()
                 
-                # Delete from both tables
+                row = cursor.execute(f'SELECT {CONTENT_SQL} FROM documents WHERE id = ?', (document_id,)).fetchone()
+                passages = cursor.execute('''
+                    SELECT id, start_offset, end_offset FROM document_passages WHERE document_id = ?
+                ''', (document_id,)).fetchall()
+                
+                # Delete from all tables
                 cursor.execute('DELETE FROM document_vectors WHERE document_id = ?', (document_id,))
+                cursor.execute('''
+                    DELETE FROM hashed_vectors
+                    WHERE (kind = 'document' AND item_id = ?)
+                       OR (kind = 'passage' AND item_id IN (SELECT id FROM document_passages WHERE document_id = ?))
+                ''', (document_id, document_id))
+                cursor.execute('DELETE FROM document_passages WHERE document_id = ?', (document_id,))
+                cursor.execute('DELETE FROM document_signatures WHERE document_id = ?', (document_id,))
+                cursor.execute('UPDATE document_signatures SET duplicate_of = NULL WHERE duplicate_of = ?',
+                               (document_id,))
+                
+                # Documents that listed this one as a neighbour are relinked below
+                relink = [row[0] for row in cursor.execute(
+                    'SELECT document_id FROM document_neighbors WHERE neighbor_id = ?', (document_id,)
+                ).fetchall()]
+                cursor.execute('DELETE FROM document_neighbors WHERE document_id = ? OR neighbor_id = ?',
+                               (document_id, document_id))
+                if not self.neighbors:
+                    self._mark_neighbor_graph_stale(conn)
+                
                 cursor.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+                if self.scorer == 'tfidf':
+                    cursor.execute('INSERT OR IGNORE INTO index_tombstones (document_id) VALUES (?)', (document_id,))
                 
                 conn.commit()
                 
-                # Update vectorizer
-                self._update_vectorizer()
+                # Update the index
+                if self.scorer == 'bm25':
+                    with self.index_lock.write():
+                        self.bm25_index.remove(document_id, row[0] if row else None)
+                        for passage_id, start, end in passages:
+                            self.bm25_passage_index.remove(passage_id, row[0][start:end] if row else None)
+                elif self.scorer == 'hashing':
+                    with self.index_lock.write():
+                        self.lsh_index.remove(document_id)
+                        for passage_id, _, _ in passages:
+                            self.lsh_passage_index.remove(passage_id)
+                elif self.scorer == 'tfidf':
+                    self._tombstone(document_id)
+                    if self.shared_index is not None:
+                        self._announce_delete(conn)
+                
+                if self.minhash_index is not None:
+                    self.minhash_index.remove(document_id)
+                
+                if self.neighbors:
+                    if self.neighbor_index not in (None, self.lsh_index):
+                        self.neighbor_index.remove(document_id)
+                    self._link_documents(conn, relink)
+                    conn.commit()
+                
+                self._invalidate_results()
                 
                 self.logger.info(f"Document {document_id} deleted")
                 return True
@@ -200,37 +1407,552 @@ class VectorStore:
             self.logger.error(f"Error deleting document {document_id}: {str(e)}")
             return False
     
-    def _update_vectorizer(self):
-        """Update the TF-IDF vectorizer with current documents"""
+    def _tombstone(self, document_id: int):
+        """Hide a deleted document and its passages by publishing a snapshot with new live masks"""
+        with self._publish_lock:
+            index = self.tfidf_index
+            self.tfidf_index = tombstoned = index.with_tombstone(document_id)
+        
+        # Documents the snapshot never held need no tombstone, nor a compaction
+        if tombstoned is index:
+            return
+        
+        if len(tombstoned.tombstones) / max(len(tombstoned.doc_ids), 1) > self.compaction_threshold:
+            self._schedule_compaction()
+    
+    def _publish(self, index: TfidfIndex):
+        """Atomically make a freshly fitted snapshot the one new searches use"""
+        stored = self._stored_tombstones()
+        with self._publish_lock:
+            # Deletes made while it was being fitted still apply; older ones are done with
+            self.tfidf_index = index.with_tombstones(self.tfidf_index.tombstones | stored, prune=True)
+    
+    def _stored_tombstones(self) -> frozenset:
+        """Documents any store deleted since the persisted index was fitted"""
+        return frozenset(row[0] for row in self.connections.get().execute('SELECT document_id FROM index_tombstones'))
+    
+    def _announce_delete(self, conn):
+        """Have stores sharing the index reload the stored tombstones"""
+        # The write lock serializes the counter update with other processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.shared_index.announce_delete()
+        finally:
+            conn.commit()
+    
+    def _schedule_compaction(self):
+        """Start a background compaction unless one is already running"""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        
+        self._compaction_thread = threading.Thread(target=self.compact, name='index-compaction', daemon=True)
+        self._compaction_thread.start()
+    
+    def compact(self):
+        """Refit the TF-IDF index without tombstoned documents"""
+        if self.scorer != 'tfidf':
+            return
+        
+        self._update_vectorizer()
+        self._invalidate_results()
+        self.logger.info("Index compacted")
+    
+    def refresh(self):
+        """Catch up with documents other connections added or deleted, without writing
+        
+        BM25 postings and hashed vectors are loaded for new documents and
+        dropped for deleted ones. A TF-IDF index is reloaded from what its
+        writer persisted, unless it follows a shared index, which searches
+        attach by themselves.
+        """
         try:
-            documents = self.list_documents()
+            if self.scorer == 'tfidf':
+                if self.shared_index is None:
+                    self._load_index()
+                    self._invalidate_results()
+                return
+            if self.scorer not in ('bm25', 'hashing'):
+                return
+            
+            conn = self.connections.get()
+            stored = {row[0] for row in conn.execute('SELECT id FROM documents')}
+            stored_passages = {row[0] for row in conn.execute('SELECT id FROM document_passages')}
+            
+            if self.scorer == 'bm25':
+                index, passage_index = self.bm25_index, self.bm25_passage_index
+                known, known_passages = set(index.doc_lengths), set(passage_index.doc_lengths)
+            else:
+                index, passage_index = self.lsh_index, self.lsh_passage_index
+                known, known_passages = set(index.vectors), set(passage_index.vectors)
+            
+            added = sorted(stored - known)
+            if not added and known <= stored and known_passages <= stored_passages:
+                return
+            
+            with self.index_lock.write():
+                for document_id in known - stored:
+                    index.remove(document_id)
+                for passage_id in known_passages - stored_passages:
+                    passage_index.remove(passage_id)
+            self._index_new_documents(added)
+            self._invalidate_results()
             
-            if documents:
-                texts = [doc['content'] for doc in documents]
-                self.vectorizer.fit(texts)
+        except Exception as e:
+            self.logger.error(f"Error refreshing index: {str(e)}")
+    
+    def _update_vectorizer(self):
+        """Refit the TF-IDF index off to the side, publish it and persist it"""
+        try:
+            with self._refit_lock:
+                with self.connections.get() as conn:
+                    rows = conn.execute(f'SELECT id, {CONTENT_SQL} FROM documents ORDER BY id').fetchall()
+                
+                # Fingerprint the rows actually fitted: a delete committed while
+                # fitting must leave the saved index stale, not passed off as current
+                fingerprint = self._rows_fingerprint(len(rows), rows[-1][0] if rows else 0)
+                
+                if rows:
+                    vectorizer = clone(self.vectorizer)
+                    matrix = vectorizer.fit_transform([row[1] for row in rows])
+                    index = self._build_index(vectorizer, np.array([row[0] for row in rows], dtype=np.int64),
+                                              matrix, contents=dict(rows))
+                else:
+                    index = TfidfIndex()
+                
+                self._publish(index)
+                self._save_index(index, fingerprint)
                 
         except Exception as e:
             self.logger.error(f"Error updating vectorizer: {str(e)}")
     
+    def _build_index(self, vectorizer: TfidfVectorizer, doc_ids: np.ndarray, matrix,
+                     contents: Dict[int, str] = None) -> TfidfIndex:
+        """Build an unpublished snapshot from a fitted document matrix, vectorizing every passage"""
+        conn = self.connections.get()
+        if contents is None:
+            contents = dict(conn.execute(f'SELECT id, {CONTENT_SQL} FROM documents'))
+        
+        rows = [
+            row for row in conn.execute('''
+                SELECT id, document_id, start_offset, end_offset FROM document_passages ORDER BY document_id, id
+            ''') if row[1] in contents
+        ]
+        
+        matrix = matrix.tocsr()
+        index = TfidfIndex(vectorizer, doc_ids, matrix, InvertedIndex(matrix))
+        if not rows:
+            return index
+        
+        passage_matrix = vectorizer.transform([contents[row[1]][row[2]:row[3]] for row in rows])
+        return replace(
+            index,
+            passage_ids=np.array([row[0] for row in rows], dtype=np.int64),
+            passage_document_ids=np.array([row[1] for row in rows], dtype=np.int64),
+            passage_index=InvertedIndex(passage_matrix)
+        )
+    
+    def _build_bm25_index(self):
+        """Build the BM25 postings from the stored documents"""
+        self.bm25_index = BM25Index(self.vectorizer.build_analyzer())
+        self.bm25_passage_index = BM25Index(self.vectorizer.build_analyzer())
+        
+        try:
+            with self.connections.get() as conn:
+                for document_id, content in conn.execute(f'SELECT id, {CONTENT_SQL} FROM documents'):
+                    self.bm25_index.add(document_id, content)
+                
+                for passage_id, text in conn.execute(f'''
+                    SELECT p.id, {PASSAGE_TEXT_SQL}
+                    FROM document_passages p JOIN documents d ON d.id = p.document_id
+                '''):
+                    self.bm25_passage_index.add(passage_id, text)
+                    
+        except Exception as e:
+            self.logger.error(f"Error building BM25 index: {str(e)}")
+    
+    def _build_lsh_index(self):
+        """Build LSH tables from the stored hashed vectors, without vectorizing again"""
+        # Queries are ranked exactly; bucket tables only serve the neighbour graph
+        self.lsh_index = (LSHIndex(weight_dtype=self.hashed_weight_dtype) if self.neighbors
+                          else LSHIndex(n_tables=0, weight_dtype=self.hashed_weight_dtype))
+        self.lsh_passage_index = LSHIndex(n_tables=0, weight_dtype=self.hashed_weight_dtype)
+        
+        try:
+            if not self.read_only:
+                with self.connections.get() as conn:
+                    self._store_missing_vectors(conn)
+            
+            self._load_hashed_vectors(self.lsh_index, '''
+                SELECT h.item_id, h.vector_data
+                FROM hashed_vectors h JOIN documents d ON d.id = h.item_id
+                WHERE h.kind = 'document'
+            ''')
+            self._load_hashed_vectors(self.lsh_passage_index, '''
+                SELECT h.item_id, h.vector_data
+                FROM hashed_vectors h JOIN document_passages p ON p.id = h.item_id
+                WHERE h.kind = 'passage'
+            ''')
+            
+        except Exception as e:
+            self.logger.error(f"Error building LSH index: {str(e)}")
+    
+    def _store_missing_vectors(self, conn):
+        """Vectorize documents and passages stored without hashed vectors"""
+        self._store_missing_document_vectors(conn)
+        
+        rows = conn.execute(f'''
+            SELECT p.id, {PASSAGE_TEXT_SQL}
+            FROM document_passages p JOIN documents d ON d.id = p.document_id
+            WHERE NOT EXISTS (SELECT 1 FROM hashed_vectors WHERE kind = 'passage' AND item_id = p.id)
+        ''').fetchall()
+        if rows:
+            self._store_hashed_vectors(conn, 'passage', [row[0] for row in rows], [row[1] for row in rows])
+        
+        conn.commit()
+    
+    def _build_neighbor_graph(self):
+        """Link the whole graph if it is missing, or was left stale by a store not maintaining it"""
+        try:
+            with self.connections.get() as conn:
+                row = conn.execute("SELECT value FROM vectorizer_state WHERE key = 'neighbor_graph'").fetchone()
+                if row is None or int(row[0]) != self.neighbors:
+                    conn.execute('DELETE FROM document_neighbors')
+                    self._link_documents(conn, sorted(self._neighbor_vectors().vectors))
+                    conn.execute('''
+                        INSERT OR REPLACE INTO vectorizer_state (key, value) VALUES ('neighbor_graph', ?)
+                    ''', (str(self.neighbors),))
+                    conn.commit()
+                    
+        except Exception as e:
+            self.logger.error(f"Error building neighbour graph: {str(e)}")
+    
+    def _neighbor_vectors(self) -> LSHIndex:
+        """LSH tables over every hashed document vector, vectorizing documents stored without one"""
+        if self.neighbor_index is None:
+            if self.scorer == 'hashing':
+                self.neighbor_index = self.lsh_index
+            else:
+                index = LSHIndex(weight_dtype=self.hashed_weight_dtype)
+                with self.connections.get() as conn:
+                    self._store_missing_document_vectors(conn)
+                    conn.commit()
+                self._load_hashed_vectors(index, '''
+                    SELECT h.item_id, h.vector_data
+                    FROM hashed_vectors h JOIN documents d ON d.id = h.item_id
+                    WHERE h.kind = 'document'
+                ''')
+                self.neighbor_index = index
+        
+        return self.neighbor_index
+    
+    def _mark_neighbor_graph_stale(self, conn):
+        """Have the next store with a neighbour graph relink it, as this one writes without maintaining it"""
+        conn.execute("DELETE FROM vectorizer_state WHERE key = 'neighbor_graph'")
+    
+    def _link_documents(self, conn, document_ids: List[int]):
+        """Link documents to their nearest neighbours, and to those neighbours in turn
+        
+        Each neighbour keeps only its closest links, so a new document
+        displaces a neighbour's weakest link if it is closer.
+        """
+        index = self._neighbor_vectors()
+        edges = []
+        for document_id in document_ids:
+            entry = index.vectors.get(document_id)
+            if entry is None:
+                continue
+            
+            vector = sparse.csr_matrix((entry[1].astype(np.float32), entry[0], [0, len(entry[0])]),
+                                       shape=(1, self.hashing_vectorizer.n_features))
+            neighbor_ids, similarities = index.query(vector, self.neighbors + 1, min_score=NEIGHBOR_MIN_SIMILARITY)
+            for neighbor_id, similarity in zip(neighbor_ids.tolist(), similarities.tolist()):
+                if neighbor_id != document_id:
+                    edges.append((document_id, neighbor_id, similarity))
+                    edges.append((neighbor_id, document_id, similarity))
+        
+        conn.executemany('''
+            INSERT OR REPLACE INTO document_neighbors (document_id, neighbor_id, similarity) VALUES (?, ?, ?)
+        ''', edges)
+        conn.executemany('''
+            DELETE FROM document_neighbors
+            WHERE document_id = ? AND neighbor_id NOT IN (
+                SELECT neighbor_id FROM document_neighbors WHERE document_id = ?
+                ORDER BY similarity DESC, neighbor_id LIMIT ?
+            )
+        ''', [(document_id, document_id, self.neighbors) for document_id in sorted({edge[0] for edge in edges})])
+    
+    def _store_missing_document_vectors(self, conn):
+        """Vectorize documents stored before hashed vectors were kept for them"""
+        rows = conn.execute(f'''
+            SELECT id, {CONTENT_SQL} FROM documents
+            WHERE NOT EXISTS (
+                SELECT 1 FROM hashed_vectors WHERE kind = 'document' AND item_id = documents.id
+            )
+        ''').fetchall()
+        if rows:
+            self._store_hashed_vectors(conn, 'document', [row[0] for row in rows], [row[1] for row in rows])
+    
+    def _load_hashed_vectors(self, index: LSHIndex, query: str, params: Tuple = ()):
+        """Add stored hashed vectors selected by a query to an LSH index"""
+        rows = self.connections.get().execute(query, params).fetchall()
+        if rows:
+            matrix = self._decode_vectors([row[1] for row in rows], self.hashing_vectorizer.n_features, np.float32)
+            
+            # Searches read only the scorer's tables; the neighbour tables are private to writers
+            searched = index is self.lsh_index or index is self.lsh_passage_index
+            with self.index_lock.write() if searched else nullcontext():
+                index.add_many([row[0] for row in rows], matrix)
+    
+    def _index_fingerprint(self, conn) -> str:
+        """Identify the state of the documents table an index was fitted on"""
+        return self._rows_fingerprint(*conn.execute('SELECT COUNT(*), COALESCE(MAX(id), 0) FROM documents').fetchone())
+    
+    def _rows_fingerprint(self, count: int, max_id: int) -> str:
+        return f"{count}:{max_id}"
+    
+    def _encode_vectors(self, matrix, precision: str = None) -> List[bytes]:
+        """Pack the rows of a sparse matrix for storage, in the configured precision unless given"""
+        return encode_rows(matrix, precision or self.vector_precision)
+    
+    def _decode_vectors(self, encoded: List[bytes], n_features: int, dtype=np.float64):
+        """Rebuild a sparse matrix from stored rows"""
+        return decode_rows(encoded, n_features, dtype)
+    
+    def _save_index(self, index: TfidfIndex, fingerprint: str):
+        """Persist a snapshot's vocabulary, IDF weights and document vectors, with the fingerprint it was fitted on"""
+        with self.connections.get() as conn:
+            conn.execute('DELETE FROM document_vectors')
+            
+            # Other keys, like the neighbour graph marker, are not part of the fitted index
+            conn.execute("DELETE FROM vectorizer_state WHERE key IN ('vocabulary', 'idf', 'fingerprint')")
+            
+            if index.doc_matrix is not None:
+                rows = zip(index.doc_ids.tolist(), self._encode_vectors(index.doc_matrix, 'float32'))
+                conn.executemany('INSERT INTO document_vectors (document_id, vector_data) VALUES (?, ?)', rows)
+                
+                vocabulary = {term: int(position) for term, position in index.vectorizer.vocabulary_.items()}
+                conn.executemany('INSERT INTO vectorizer_state (key, value) VALUES (?, ?)', [
+                    ('vocabulary', json.dumps(vocabulary)),
+                    ('idf', json.dumps(index.vectorizer.idf_.tolist()))
+                ])
+            
+            conn.execute('INSERT INTO vectorizer_state (key, value) VALUES (?, ?)', ('fingerprint', fingerprint))
+            
+            # Tombstones of documents the new index was fitted without are done with
+            stored = self._stored_tombstones()
+            held = set(index.doc_ids.tolist()) if index.doc_matrix is not None else set()
+            conn.executemany('DELETE FROM index_tombstones WHERE document_id = ?',
+                             [(document_id,) for document_id in stored - held])
+            
+            # Still holding the database write lock, so publishers in other processes wait their turn
+            if self.shared_index is not None:
+                self._publish_shared(index, fingerprint)
+            conn.commit()
+        
+        self._save_snapshot(index, fingerprint)
+        
+        # Drop the private copy in favour of the shared one
+        if self.shared_index is not None:
+            self._attach_shared_index()
+    
+    def _save_snapshot(self, index: TfidfIndex, fingerprint: str):
+        """Write a fitted index as a memory-mappable on-disk snapshot"""
+        if index.doc_matrix is None:
+            return
+        
+        try:
+            save_snapshot(self.snapshot_dir, fingerprint, *self._index_arrays(index))
+            
+        except Exception as e:
+            self.logger.error(f"Error saving index snapshot: {str(e)}")
+    
+    def _index_arrays(self, index: TfidfIndex) -> Tuple[Dict[str, int], Dict[str, np.ndarray]]:
+        """Flatten a fitted index into its vocabulary and the arrays of index_snapshot.ARRAYS"""
+        # An index without passages still yields valid, empty posting arrays
+        passage_index = index.passage_index or InvertedIndex(sparse.csr_matrix((0, index.doc_matrix.shape[1])))
+        
+        vocabulary = {term: int(position) for term, position in index.vectorizer.vocabulary_.items()}
+        return vocabulary, {
+            'idf': index.vectorizer.idf_,
+            'doc_ids': index.doc_ids,
+            'data': index.doc_matrix.data,
+            'indices': index.doc_matrix.indices,
+            'indptr': index.doc_matrix.indptr,
+            'postings_weights': index.inverted_index.weights,
+            'postings_positions': index.inverted_index.doc_positions,
+            'postings_indptr': index.inverted_index.indptr,
+            'max_weights': index.inverted_index.max_weights,
+            'passage_ids': index.passage_ids,
+            'passage_document_ids': index.passage_document_ids,
+            'passage_postings_weights': passage_index.weights,
+            'passage_postings_positions': passage_index.doc_positions,
+            'passage_postings_indptr': passage_index.indptr,
+            'passage_max_weights': passage_index.max_weights
+        }
+    
+    def _index_from_arrays(self, vocabulary: Dict[str, int], arrays: Dict[str, np.ndarray]) -> TfidfIndex:
+        """Rebuild a fitted index around flattened arrays without copying them"""
+        n_documents = len(arrays['doc_ids'])
+        n_passages = len(arrays['passage_ids'])
+        matrix = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=(n_documents, len(vocabulary)), copy=False
+        )
+        
+        return TfidfIndex(
+            vectorizer=self._fitted_vectorizer(vocabulary, np.asarray(arrays['idf'])),
+            doc_ids=arrays['doc_ids'],
+            doc_matrix=matrix,
+            inverted_index=InvertedIndex.from_arrays(
+                n_documents, arrays['postings_indptr'], arrays['postings_positions'],
+                arrays['postings_weights'], arrays['max_weights']
+            ),
+            passage_ids=arrays['passage_ids'],
+            passage_document_ids=arrays['passage_document_ids'],
+            passage_index=InvertedIndex.from_arrays(
+                n_passages, arrays['passage_postings_indptr'], arrays['passage_postings_positions'],
+                arrays['passage_postings_weights'], arrays['passage_max_weights']
+            ) if n_passages else None
+        )
+    
+    def _fitted_vectorizer(self, vocabulary: Dict[str, int], idf: np.ndarray) -> TfidfVectorizer:
+        """Restore a fitted vectorizer from a persisted vocabulary and IDF weights"""
+        vectorizer = clone(self.vectorizer)
+        vectorizer.vocabulary_ = vocabulary
+        vectorizer.idf_ = idf
+        return vectorizer
+    
+    def _load_snapshot(self, fingerprint: str) -> bool:
+        """Open a matching snapshot with zero-copy memory maps"""
+        snapshot = load_snapshot(self.snapshot_dir, fingerprint)
+        if snapshot is None:
+            return False
+        
+        self._publish(self._index_from_arrays(snapshot['vocabulary'], snapshot))
+        return True
+    
+    def _publish_shared(self, index: TfidfIndex, fingerprint: str):
+        """Copy a fitted index into a new shared-memory version; callers hold the database write lock"""
+        if index.doc_matrix is None:
+            return
+        
+        try:
+            self.shared_index.publish(fingerprint, *self._index_arrays(index))
+            
+        except Exception as e:
+            self.logger.error(f"Error publishing shared index: {str(e)}")
+    
+    def _share_index(self):
+        """Publish the loaded index unless the shared version already matches the documents"""
+        with self.connections.get() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            fingerprint = self._index_fingerprint(conn)
+            if self.shared_index.fingerprint != fingerprint:
+                self._publish_shared(self.tfidf_index, fingerprint)
+        
+        self._attach_shared_index()
+    
+    def _attach_shared_index(self, fresh_only: bool = False) -> bool:
+        """Switch to a newer shared index published by any worker process
+        
+        With fresh_only, an index fitted on other documents than the
+        database now holds is left unused.
+        """
+        # Threads finding another one attaching keep searching the current snapshot
+        if not self._attach_lock.acquire(blocking=False):
+            return False
+        
+        try:
+            attached = self.shared_index.attach()
+            if attached is None:
+                return False
+            
+            fingerprint, vocabulary, arrays = attached
+            if fresh_only and fingerprint != self._index_fingerprint(self.connections.get()):
+                return False
+            
+            self._publish(self._index_from_arrays(vocabulary, arrays))
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error attaching shared index: {str(e)}")
+            return False
+        finally:
+            self._attach_lock.release()
+    
+    def _current_tfidf_index(self) -> TfidfIndex:
+        """The snapshot to search, attaching a newer shared version first"""
+        if self.shared_index is not None:
+            if self.shared_index.latest_version() != self.shared_index.version:
+                self._attach_shared_index()
+            
+            # Read the count first, so a delete landing meanwhile is reloaded next time
+            deletes = self.shared_index.latest_deletes()
+            if deletes != self._deletes_seen:
+                self._deletes_seen = deletes
+                self._publish(self.tfidf_index)
+        return self.tfidf_index
+    
+    def _load_index(self):
+        """Load the persisted index, refitting if it no longer matches the documents"""
+        try:
+            with self.connections.get() as conn:
+                fingerprint = self._index_fingerprint(conn)
+                
+                # Fast path: memory-map the on-disk snapshot
+                if self._load_snapshot(fingerprint):
+                    return
+                
+                state = dict(conn.execute('SELECT key, value FROM vectorizer_state').fetchall())
+                
+                if state.get('fingerprint') != fingerprint and not self.read_only:
+                    self._update_vectorizer()
+                    return
+                
+                if 'vocabulary' not in state:
+                    self._publish(TfidfIndex())
+                    return
+                
+                rows = conn.execute('''
+                    SELECT document_id, vector_data FROM document_vectors
+                    ORDER BY document_id
+                ''').fetchall()
+            
+            vectorizer = self._fitted_vectorizer(json.loads(state['vocabulary']), np.array(json.loads(state['idf'])))
+            matrix = self._decode_vectors([row[1] for row in rows], len(vectorizer.vocabulary_))
+            index = self._build_index(vectorizer, np.array([row[0] for row in rows], dtype=np.int64), matrix)
+            self._publish(index)
+            if not self.read_only:
+                self._save_snapshot(index, fingerprint)
+                
+        except Exception as e:
+            self.logger.error(f"Error loading index: {str(e)}")
+            if not self.read_only:
+                self._update_vectorizer()
+    
+    def close(self):
+        """Wait for a running compaction, then detach shared memory and close the database connections"""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        if self.shared_index is not None:
+            self.tfidf_index = TfidfIndex()
+            self.shared_index.close()
+        self.connections.close()
+    
     def get_document_stats(self) -> Dict:
         """Get statistics about the document store"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.get() as conn:
                 cursor = conn.cursor()
                 
-                # Total documents
-                cursor.execute('SELECT COUNT(*) FROM documents')
-                total_docs = cursor.fetchone()[0]
-                
-                # Documents by type
-                cursor.execute('''
-                    SELECT document_type, COUNT(*) 
-                    FROM documents 
-                    GROUP BY document_type
-                ''')
+                # Documents by type, one trigger-maintained row per type
+                cursor.execute('SELECT document_type, document_count FROM document_stats')
                 by_type = dict(cursor.fetchall())
                 
-                # Recent documents (last 7 days)
+                # Total documents
+                total_docs = sum(by_type.values())
+                
+                # Recent documents (last 7 days), a range scan of idx_documents_timestamp_id
                 cursor.execute('''
                     SELECT COUNT(*) FROM documents 
                     WHERE timestamp > datetime('now', '-7 days')
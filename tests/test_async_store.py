@@ -0,0 +1,84 @@
+import unittest
+import asyncio
+import tempfile
+import os
+import sys
+import shutil
+import threading
+import time
+from unittest.mock import MagicMock
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from async_store import AsyncVectorStore
+
+class TestAsyncVectorStore(unittest.IsolatedAsyncioTestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.processor = MagicMock()
+        self.store = AsyncVectorStore(processor=self.processor, search_workers=4, ocr_workers=2,
+                                      db_path=os.path.join(self.temp_dir, 'documents.db'))
+    
+    async def asyncTearDown(self):
+        await self.store.close()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    async def test_add_search_and_get(self):
+        """Test the awaitable document API end to end"""
+        doc_id = await self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar.", "Medical")
+        await self.store.add_documents([
+            {'filename': "doc2.txt", 'content': "Information about cholesterol and heart health."}
+        ])
+        
+        results = await asyncio.gather(*(self.store.search_documents("diabetes blood sugar") for _ in range(8)))
+        
+        self.assertTrue(all(result[0]['id'] == doc_id for result in results))
+        self.assertEqual((await self.store.get_document(doc_id))['filename'], "doc1.txt")
+        self.assertTrue(await self.store.delete_document(doc_id))
+    
+    async def test_writes_serialized(self):
+        """Test that concurrent writes never overlap"""
+        active = []
+        overlaps = []
+        original = self.store.store.add_document
+        
+        def add_document(*args):
+            active.append(threading.get_ident())
+            overlaps.append(len(active))
+            time.sleep(0.01)
+            active.pop()
+            return original(*args)
+        
+        self.store.store.add_document = add_document
+        await asyncio.gather(*(self.store.add_document(f"doc{i}.txt", f"Lab report {i}.") for i in range(5)))
+        
+        self.assertEqual(max(overlaps), 1)
+        self.assertEqual(len(self.store.store.list_documents()), 5)
+    
+    async def test_ocr_concurrency_capped(self):
+        """Test that text extraction runs at most ocr_workers at a time"""
+        lock = threading.Lock()
+        running = [0, 0]
+        
+        def extract_text(path):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return f"Text of {path} with glucose values."
+        
+        self.processor.extract_text.side_effect = extract_text
+        ids = await asyncio.gather(*(self.store.ingest_file(f"scan{i}.png") for i in range(6)))
+        
+        self.assertEqual(running[1], 2)
+        self.assertEqual(len(set(ids)), 6)
+        self.assertEqual((await self.store.get_document(ids[0]))['filename'], "scan0.png")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bm25_index import BM25Index
+
+class TestBM25Index(unittest.TestCase):
+    
+    def setUp(self):
+        self.analyzer = CountVectorizer(stop_words='english').build_analyzer()
+        self.index = BM25Index(self.analyzer)
+        self.documents = {
+            1: "Patient glucose elevated, diabetes follow up recommended.",
+            2: "Cholesterol panel with LDL and HDL cholesterol values.",
+            3: "Blood pressure medication lisinopril prescribed.",
+            4: "Glucose tolerance test normal, no diabetes."
+        }
+        for document_id, text in self.documents.items():
+            self.index.add(document_id, text)
+    
+    def test_search_ranks_matching_documents(self):
+        """Test that only documents containing query terms are ranked"""
+        ids, scores = self.index.search("diabetes glucose")
+        
+        self.assertEqual(set(ids), {1, 4})
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+    
+    def test_scores_match_reference_formula(self):
+        """Test BM25 scores against a direct computation"""
+        _, scores = self.index.search("cholesterol")
+        
+        n_documents, df, tf = 4, 1, 2
+        length = len(self.analyzer(self.documents[2]))
+        average_length = sum(len(self.analyzer(text)) for text in self.documents.values()) / n_documents
+        idf = np.log(1 + (n_documents - df + 0.5) / (df + 0.5))
+        expected = idf * tf * 2.5 / (tf + 1.5 * (0.25 + 0.75 * length / average_length))
+        
+        self.assertAlmostEqual(scores[0], expected)
+    
+    def test_incremental_updates_match_rebuild(self):
+        """Test that add/remove keeps the same statistics as indexing from scratch"""
+        self.index.remove(2, self.documents[2])
+        self.index.add(5, "Repeat glucose test in three months.")
+        
+        rebuilt = BM25Index(self.analyzer)
+        for document_id in (1, 3, 4):
+            rebuilt.add(document_id, self.documents[document_id])
+        rebuilt.add(5, "Repeat glucose test in three months.")
+        
+        for query in ["glucose test", "cholesterol", "diabetes medication"]:
+            ids, scores = self.index.search(query)
+            expected_ids, expected_scores = rebuilt.search(query)
+            self.assertEqual(list(ids), list(expected_ids))
+            np.testing.assert_allclose(scores, expected_scores)
+        
+        self.assertNotIn('cholesterol', self.index.postings)
+    
+    def test_candidates_restrict_scoring(self):
+        """Test that only candidate documents are scored, with unchanged scores"""
+        all_ids, all_scores = self.index.search("diabetes glucose")
+        ids, scores = self.index.search("diabetes glucose", candidates=np.array([4]))
+        
+        self.assertEqual(list(ids), [4])
+        self.assertAlmostEqual(scores[0], dict(zip(all_ids, all_scores))[4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import threading
+import time
+import random
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rw_lock import ReadWriteLock
+from vector_store import VectorStore
+
+class TestReadWriteLock(unittest.TestCase):
+    
+    def test_readers_share_the_lock(self):
+        """Test that readers hold the lock at the same time"""
+        lock = ReadWriteLock()
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def read():
+            with lock.read():
+                barrier.wait()
+        
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join(timeout=5)
+        
+        self.assertFalse(barrier.broken)
+    
+    def test_writer_excludes_readers_and_is_served_first(self):
+        """Test that a waiting writer blocks new readers until it is done"""
+        lock = ReadWriteLock()
+        events = []
+        
+        def write():
+            lock.acquire_write()
+            events.append('write')
+        
+        def read():
+            lock.acquire_read()
+            events.append('read')
+        
+        lock.acquire_read()
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not lock._waiting_writers:
+            time.sleep(0.001)
+        
+        reader = threading.Thread(target=read)
+        reader.start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        
+        lock.release_read()
+        writer.join(timeout=5)
+        self.assertEqual(events, ['write'])
+        
+        lock.release_write()
+        reader.join(timeout=5)
+        self.assertEqual(events, ['write', 'read'])
+
+class TestVectorStoreStress(unittest.TestCase):
+    
+    STABLE_DOCUMENTS = 40
+    QUERIES = 320
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _stress(self, scorer: str, n_threads: int) -> float:
+        """Search from n_threads while a writer adds and deletes documents; returns queries per second"""
+        store = VectorStore(db_path=os.path.join(self.temp_dir, f"{scorer}-{n_threads}.db"), scorer=scorer,
+                            cache_size=0)
+        stable = store.add_documents([
+            {'filename': f"stable{i}.txt", 'content': f"zeta{i} zeta{i} zeta{i} glucose panel report"}
+            for i in range(self.STABLE_DOCUMENTS)
+        ])['ids']
+        
+        errors = []
+        done = threading.Event()
+        
+        def write():
+            churn = 0
+            while not done.is_set():
+                doc_id = store.add_document(f"churn{churn}.txt", f"omega{churn} omega{churn} cholesterol note")
+                if not store.delete_document(doc_id):
+                    errors.append(f"delete of {doc_id} failed")
+                churn += 1
+        
+        def read(seed: int):
+            rng = random.Random(seed)
+            for _ in range(self.QUERIES // n_threads):
+                position = rng.randrange(self.STABLE_DOCUMENTS)
+                results = store.search_documents(f"zeta{position}", top_k=3)
+                if not results or results[0]['id'] != stable[position]:
+                    errors.append(f"zeta{position} returned {[doc['id'] for doc in results]}")
+        
+        writer = threading.Thread(target=write)
+        readers = [threading.Thread(target=read, args=(seed,)) for seed in range(n_threads)]
+        
+        writer.start()
+        started = time.perf_counter()
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        writer.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(store.get_document_stats()['total_documents'], self.STABLE_DOCUMENTS)
+        self.assertEqual(store.search_documents("omega0 cholesterol"), [])
+        store.close()
+        
+        return (self.QUERIES // n_threads) * n_threads / elapsed
+    
+    def test_concurrent_search_during_ingest(self):
+        """Test search results under concurrent ingest and delete, reporting throughput at 1, 4 and 16 threads"""
+        for scorer in ('tfidf', 'bm25', 'hashing'):
+            for n_threads in (1, 4, 16):
+                with self.subTest(scorer=scorer, threads=n_threads):
+                    throughput = self._stress(scorer, n_threads)
+                    print(f"{scorer} with {n_threads} search threads: {throughput:.0f} queries/s")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import zlib
+from unittest.mock import patch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import content_codec
+from content_codec import CODECS, compress_content, decompress_content, content_substr
+
+class TestContentCodec(unittest.TestCase):
+    
+    def setUp(self):
+        self.text = "Glucose: 95 mg/dL (Normal: 70-99) μL\n" * 2000
+    
+    def test_round_trip(self):
+        """Test that every codec restores the original text"""
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                stored = compress_content(self.text, codec)
+                
+                self.assertEqual(decompress_content(stored, codec), self.text)
+                if codec != 'none':
+                    self.assertLess(len(stored), len(self.text.encode('utf-8')) // 10)
+    
+    def test_substr_matches_sqlite_semantics(self):
+        """Test slices against plain string slicing, including multi-byte characters"""
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                stored = compress_content(self.text, codec)
+                
+                self.assertEqual(content_substr(stored, codec, 1, 20), self.text[:20])
+                self.assertEqual(content_substr(stored, codec, 30, 12), self.text[29:41])
+                self.assertEqual(content_substr(stored, codec, len(self.text) - 5, 100), self.text[-6:])
+    
+    def test_substr_decompresses_only_a_prefix(self):
+        """Test that a short prefix does not decompress the whole document"""
+        stored = compress_content(self.text, 'zlib')
+        
+        with patch.object(content_codec, 'CHUNK_SIZE', 1024):
+            decompressor = zlib.decompressobj()
+            with patch.object(zlib, 'decompressobj', return_value=decompressor):
+                content_substr(stored, 'zlib', 1, 100)
+        
+        self.assertFalse(decompressor.eof)
+    
+    def test_unknown_codec(self):
+        """Test that unknown codecs are rejected"""
+        with self.assertRaises(ValueError):
+            compress_content(self.text, 'brotli')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from inverted_index import InvertedIndex
+
+class TestInvertedIndex(unittest.TestCase):
+    
+    def setUp(self):
+        # Random L2-normalized document-term matrix
+        self.matrix = normalize(sparse.random(500, 200, density=0.05, format='csr', random_state=42))
+        self.index = InvertedIndex(self.matrix)
+        self.rng = np.random.default_rng(7)
+    
+    def _exhaustive_search(self, terms, weights, top_k, min_score):
+        """Reference search scoring every document"""
+        query = np.zeros(self.matrix.shape[1])
+        query[terms] = weights
+        scores = self.matrix @ query
+        ranked = [idx for idx in np.argsort(-scores, kind='stable')[:top_k] if scores[idx] > min_score]
+        return ranked, scores[ranked]
+    
+    def test_matches_exhaustive_search(self):
+        """Test that pruned search returns the same ranking as scoring everything"""
+        for _ in range(50):
+            terms = self.rng.choice(self.matrix.shape[1], size=self.rng.integers(1, 8), replace=False)
+            weights = self.rng.random(len(terms))
+            weights /= np.linalg.norm(weights)
+            
+            for top_k, min_score in [(1, 0.0), (5, 0.1), (20, 0.05)]:
+                positions, scores = self.index.search(terms, weights, top_k, min_score=min_score)
+                expected_positions, expected_scores = self._exhaustive_search(terms, weights, top_k, min_score)
+                
+                np.testing.assert_allclose(scores, expected_scores)
+                self.assertEqual(list(positions), expected_positions)
+    
+    def test_only_scores_matching_documents(self):
+        """Test that documents sharing no term with the query are not returned"""
+        term = int(np.argmax(np.diff(self.matrix.tocsc().indptr)))
+        positions, _ = self.index.search(np.array([term]), np.array([1.0]), top_k=1000)
+        
+        expected, _ = self.index.postings(term)
+        self.assertEqual(sorted(positions), sorted(expected))
+    
+    def test_allowed_mask_matches_filtered_exhaustive_search(self):
+        """Test that a mask restricts the ranking to allowed documents"""
+        allowed = self.rng.random(self.matrix.shape[0]) < 0.2
+        for _ in range(20):
+            terms = self.rng.choice(self.matrix.shape[1], size=4, replace=False)
+            weights = np.full(4, 0.5)
+            
+            positions, scores = self.index.search(terms, weights, top_k=5, allowed=allowed)
+            
+            query = np.zeros(self.matrix.shape[1])
+            query[terms] = weights
+            expected_scores = np.where(allowed, self.matrix @ query, 0.0)
+            expected = [idx for idx in np.argsort(-expected_scores, kind='stable')[:5] if expected_scores[idx] > 0]
+            self.assertTrue(allowed[positions].all())
+            self.assertEqual(list(positions), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import numpy as np
+from scipy import sparse
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lsh_index import LSHIndex
+
+class TestLSHIndex(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.matrix = sparse.random(300, 5000, density=0.01, format='csr', random_state=rng)
+        self.matrix = sparse.csr_matrix(self.matrix.multiply(1 / sparse.linalg.norm(self.matrix, axis=1)[:, None]))
+        self.index = LSHIndex(n_tables=8, n_bits=8)
+        self.index.add_many(list(range(300)), self.matrix)
+    
+    def test_exact_match_is_found(self):
+        """Test that an indexed vector is always its own nearest neighbour"""
+        for item_id in (0, 42, 299):
+            ids, scores = self.index.query(self.matrix[item_id], top_k=1)
+            
+            self.assertEqual(ids[0], item_id)
+            self.assertAlmostEqual(scores[0], 1.0)
+    
+    def test_recall_against_exact_search(self):
+        """Test that blended queries mostly recover the exact top-k"""
+        rng = np.random.default_rng(11)
+        hits = total = 0
+        for item_id in range(0, 300, 10):
+            query = self.matrix[item_id] + 0.5 * self.matrix[rng.integers(300)]
+            expected, _ = self.index.exact_query(query, top_k=2, min_score=0.1)
+            found, _ = self.index.query(query, top_k=2, min_score=0.1)
+            hits += len(set(expected) & set(found))
+            total += len(expected)
+        
+        self.assertGreater(hits / total, 0.8)
+        self.assertLess(len(self.index.candidates(self.matrix[0])), 300)
+    
+    def test_search_is_exact(self):
+        """Test that posting-list search matches exact ranking across rebuilds, changes and filters"""
+        self.assertIsNotNone(self.index._postings)
+        self.index.remove(42)
+        self.index.add_many([7, 300], self.matrix[[8, 9]])
+        
+        for item_id in range(0, 300, 10):
+            # A few features of one item, like a short keyword query
+            row = self.matrix[item_id]
+            query = sparse.csr_matrix((row.data[:3], row.indices[:3], [0, 3]), shape=row.shape)
+            
+            expected_ids, expected_scores = self.index.exact_query(query, top_k=5, min_score=0.1)
+            found_ids, found_scores = self.index.search(query, top_k=5, min_score=0.1)
+            np.testing.assert_array_equal(found_ids, expected_ids)
+            np.testing.assert_allclose(found_scores, expected_scores)
+            
+            allowed = [allowed_id for allowed_id in range(301) if allowed_id % 7]
+            expected_ids, _ = self.index._rank(sorted(set(allowed) - {42}), query, 5, 0.1)
+            np.testing.assert_array_equal(self.index.search(query, top_k=5, min_score=0.1, allowed=allowed)[0],
+                                          expected_ids)
+    
+    def test_remove(self):
+        """Test that removed items are no longer returned"""
+        self.index.remove(42)
+        ids, _ = self.index.query(self.matrix[42], top_k=3)
+        
+        self.assertNotIn(42, ids)
+        self.assertEqual(len(self.index), 299)
+        self.assertTrue(all(42 not in bucket for table in self.index.tables for bucket in table.values()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import sys
+import numpy as np
+from unittest.mock import patch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from minhash_index import MinHashIndex
+
+REPORT = ("LABORATORY RESULTS: Glucose: 95 mg/dL (Normal: 70-99). Total Cholesterol: 185 mg/dL. "
+          "HDL Cholesterol: 45 mg/dL. Continue metformin 500mg twice daily and follow up in 3 months.")
+
+# The same report with a few characters misread by OCR
+RESCAN = REPORT.replace("Glucose", "GIucose").replace("185", "l85")
+
+OTHER = "Prescription for lisinopril 10mg once daily for blood pressure, refill three times."
+
+class TestMinHashIndex(unittest.TestCase):
+    
+    def setUp(self):
+        self.index = MinHashIndex()
+        self.index.add(1, self.index.signature(REPORT))
+        self.index.add(2, self.index.signature(OTHER))
+    
+    def test_finds_near_duplicates(self):
+        """Test that a rescan matches its original and unrelated text matches nothing"""
+        matches = self.index.query(self.index.signature(RESCAN), threshold=0.8)
+        self.assertEqual([item_id for item_id, _ in matches], [1])
+        self.assertGreaterEqual(matches[0][1], 0.8)
+        
+        self.assertEqual(self.index.query(self.index.signature("Thyroid panel: TSH 2.1 mIU/L"), 0.5), [])
+    
+    def test_signature_ignores_case_and_spacing(self):
+        """Test that formatting differences do not change the signature"""
+        self.assertEqual(list(self.index.signature(REPORT.upper().replace(" ", "  \n"))),
+                         list(self.index.signature(REPORT)))
+    
+    def test_query_only_compares_bucket_candidates(self):
+        """Test that a query scores items sharing a band, not every stored signature"""
+        for item_id in range(3, 200):
+            self.index.add(item_id, self.index.signature(f"Unrelated note {item_id} about appointment scheduling"))
+        
+        with patch('minhash_index.np.mean', wraps=np.mean) as mean:
+            self.index.query(self.index.signature(RESCAN), threshold=0.8)
+        self.assertLess(mean.call_count, 20)
+    
+    def test_remove(self):
+        """Test that removed items leave every band"""
+        self.index.remove(1)
+        self.assertEqual(self.index.query(self.index.signature(REPORT), threshold=0.5), [])
+        self.assertTrue(all(1 not in bucket for table in self.index.tables for bucket in table.values()))
+        self.assertEqual(len(self.index), 1)
+
+if __name__ == '__main__':
+    unittest.main()
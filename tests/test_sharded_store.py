@@ -0,0 +1,167 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+from unittest.mock import patch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import sharded_store
+from sharded_store import ShardedVectorStore
+from vector_store import VectorStore
+
+def _worker_state() -> dict:
+    """Shards a pool worker opened: db path -> (read-only, duplicate detection off, documents indexed)"""
+    state = {}
+    for path, (_, store) in sharded_store._worker_shards.items():
+        if store.scorer == 'bm25':
+            indexed = len(store.bm25_index)
+        elif store.scorer == 'hashing':
+            indexed = len(store.lsh_index)
+        else:
+            indexed = len(store.tfidf_index.doc_ids) - len(store.tfidf_index.tombstones)
+        state[path] = (store.read_only, store.minhash_index is None, indexed)
+    return state
+
+class TestShardedVectorStore(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.documents = [
+            {'filename': f"report{i}.txt", 'content': f"Routine lab report {i} with normal values.", 'document_type': "Lab Report"}
+            for i in range(12)
+        ] + [
+            {'filename': "diabetes.txt", 'content': "This document discusses diabetes and blood sugar management.",
+             'document_type': "Medical"},
+            {'filename': "cholesterol.txt", 'content': "Information about cholesterol and heart health.",
+             'document_type': "Medical"}
+        ]
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_documents_partitioned_and_routed(self):
+        """Test that documents spread over shards and global ids route back to them"""
+        store = ShardedVectorStore(self.temp_dir, n_shards=3, processes=0)
+        try:
+            ids = store.add_documents(self.documents)['ids']
+            
+            self.assertEqual(len(set(ids)), len(self.documents))
+            self.assertEqual(len({doc_id % 3 for doc_id in ids}), 3)
+            self.assertEqual(store.get_document(ids[12])['filename'], "diabetes.txt")
+            self.assertEqual(store.get_document(ids[12])['id'], ids[12])
+            self.assertEqual(store.get_document_stats()['documents_by_type'], {"Lab Report": 12, "Medical": 2})
+            
+            listed = list(store.iter_documents(columns=['filename']))
+            self.assertEqual(sorted(doc['id'] for doc in listed), sorted(ids))
+            
+            # Keyset pages over the merged stream cover every document once
+            pages = []
+            after = None
+            while True:
+                page = list(store.iter_documents(columns=['filename'], after=after, limit=5))
+                if not page:
+                    break
+                pages.extend(page)
+                after = (page[-1]['timestamp'], page[-1]['id'])
+            self.assertEqual([doc['id'] for doc in pages], [doc['id'] for doc in listed])
+            
+            self.assertTrue(store.delete_document(ids[12]))
+            self.assertEqual(store.get_document(ids[12]), {})
+        finally:
+            store.close()
+    
+    def test_near_duplicates_detected_across_shards(self):
+        """Test that rescans hashing to another shard are still found as near-duplicates"""
+        report = ("LABORATORY RESULTS: Glucose: 95 mg/dL (Normal: 70-99). Total Cholesterol: 185 mg/dL. "
+                  "HDL Cholesterol: 45 mg/dL. Continue metformin 500mg twice daily.")
+        rescan = report.replace("Glucose", "GIucose")
+        prescription = "Prescription for lisinopril 10mg once daily."
+        
+        store = ShardedVectorStore(self.temp_dir, n_shards=4, processes=0, duplicates='skip')
+        try:
+            self.assertNotEqual(store._shard_for("report-rescan.pdf", rescan), store._shard_for("report.pdf", report))
+            original_id = store.add_document("report.pdf", report, "Lab Results")
+            self.assertEqual(store.add_document("report-rescan.pdf", rescan, "Lab Results"), original_id)
+            
+            # Within one batch too
+            self.assertNotEqual(store._shard_for("prescription-copy.txt", prescription + "!"),
+                                store._shard_for("prescription.txt", prescription))
+            ids = store.add_documents([
+                {'filename': "prescription.txt", 'content': prescription},
+                {'filename': "prescription-copy.txt", 'content': prescription + "!"}
+            ])['ids']
+            self.assertEqual(ids[1], ids[0])
+            self.assertEqual(store.get_document_stats()['total_documents'], 2)
+        finally:
+            store.close()
+    
+    def test_near_duplicates_keep_hash_placement(self):
+        """Test that flagged near-duplicates stay in their own shard instead of piling onto the original's"""
+        report = ("LABORATORY RESULTS: Glucose: 95 mg/dL (Normal: 70-99). Total Cholesterol: 185 mg/dL. "
+                  "HDL Cholesterol: 45 mg/dL. Continue metformin 500mg twice daily.")
+        documents = [{'filename': f"report-{i}.pdf", 'content': report + "!" * (i % 2)} for i in range(40)]
+        
+        store = ShardedVectorStore(self.temp_dir, n_shards=4, processes=0)
+        try:
+            result = store.add_documents(documents)
+            shards = [doc_id % store.n_shards for doc_id in result['ids']]
+            self.assertEqual(shards, [store._shard_for(doc['filename'], doc['content']) for doc in documents])
+            self.assertEqual(len(set(shards)), store.n_shards)
+            
+            # Every copy after the first is reported, whichever shard holds the original
+            self.assertEqual(sorted(result['duplicates']), list(range(1, 40)))
+            self.assertTrue(set(result['duplicates'].values()) <= set(result['ids']))
+        finally:
+            store.close()
+    
+    def test_failed_add_returns_minus_one(self):
+        """Test that a shard's failed add is reported as -1, not turned into a global id"""
+        store = ShardedVectorStore(self.temp_dir, n_shards=3, processes=0)
+        try:
+            with patch.object(VectorStore, 'add_document', return_value=-1):
+                self.assertEqual(store.add_document("diabetes.txt", "Blood sugar log.", "Medical"), -1)
+            self.assertGreaterEqual(store.add_document("diabetes.txt", "Blood sugar log.", "Medical"), 0)
+        finally:
+            store.close()
+    
+    def test_parallel_search_merges_shards(self):
+        """Test that process-pool fan-out returns the best documents of all shards"""
+        for scorer in ('tfidf', 'bm25', 'hashing'):
+            with self.subTest(scorer=scorer):
+                self._check_parallel_search(os.path.join(self.temp_dir, scorer), scorer)
+    
+    def _check_parallel_search(self, db_dir: str, scorer: str):
+        store = ShardedVectorStore(db_dir, n_shards=3, processes=2, scorer=scorer)
+        try:
+            ids = store.add_documents(self.documents)['ids']
+            
+            results = store.search_documents("diabetes blood sugar")
+            self.assertEqual(results[0]['id'], ids[12])
+            
+            # Same merged ranking as searching the shards in this process
+            store.processes = 0
+            self.assertEqual(store.search_documents("diabetes blood sugar"), results)
+            store.processes = 2
+            
+            # Workers pick up documents added after they opened their shards
+            new_id = store.add_document("lisinopril.txt", "Prescription refill for lisinopril.", "Prescription")
+            self.assertEqual(store.search_documents("lisinopril")[0]['id'], new_id)
+            
+            store.delete_document(ids[12])
+            self.assertNotIn(ids[12], [doc['id'] for doc in store.search_documents("diabetes blood sugar")])
+            
+            # Each worker holds only its own shards, read-only and caught up without reopening
+            for worker in range(2):
+                state = store._pool_for(worker).submit(_worker_state).result()
+                self.assertEqual(state, {
+                    store.shard_paths[shard]: (True, True, store.shards[shard].get_document_stats()['total_documents'])
+                    for shard in range(worker, 3, 2)
+                })
+        finally:
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
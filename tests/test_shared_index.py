@@ -0,0 +1,147 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import uuid
+import multiprocessing
+import numpy as np
+from unittest.mock import patch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from shared_index import SharedIndex, unlink_shared_index
+from vector_store import VectorStore
+
+def _search_in_worker(db_path: str, name: str, query: str):
+    """Open a store in a fresh process and report the shared version it attached and its results"""
+    store = VectorStore(db_path=db_path, shared_index=name)
+    result = (store.shared_index.version, [doc['filename'] for doc in store.search_documents(query)])
+    store.close()
+    return result
+
+# Store kept open by a long-lived worker process
+_worker_store = None
+
+def _open_worker_store(db_path: str, name: str):
+    global _worker_store
+    _worker_store = VectorStore(db_path=db_path, shared_index=name)
+
+def _search_worker_store(query: str):
+    return [doc['id'] for doc in _worker_store.search_documents(query)]
+
+class TestSharedIndex(unittest.TestCase):
+    
+    def setUp(self):
+        self.name = f"test-index-{uuid.uuid4().hex[:12]}"
+    
+    def tearDown(self):
+        unlink_shared_index(self.name)
+    
+    def test_publish_and_attach(self):
+        """Test that a published version is attached read-only and replaced by the next one"""
+        publisher = SharedIndex(self.name)
+        reader = SharedIndex(self.name)
+        self.assertIsNone(reader.attach())
+        
+        publisher.publish('1:1', {'glucose': 0}, {'ids': np.arange(5, dtype=np.int64), 'empty': np.zeros(0)})
+        fingerprint, vocabulary, arrays = reader.attach()
+        
+        self.assertEqual((reader.version, fingerprint, vocabulary), (1, '1:1', {'glucose': 0}))
+        np.testing.assert_array_equal(arrays['ids'], np.arange(5))
+        self.assertEqual(arrays['empty'].shape, (0,))
+        self.assertFalse(arrays['ids'].flags.writeable)
+        self.assertIsNone(reader.attach())
+        
+        publisher.publish('2:2', {'glucose': 0}, {'ids': np.arange(3, dtype=np.int64), 'empty': np.zeros(0)})
+        self.assertEqual(reader.latest_version(), 2)
+        
+        # The old version stays mapped while its arrays are in use
+        np.testing.assert_array_equal(arrays['ids'], np.arange(5))
+        np.testing.assert_array_equal(reader.attach()[2]['ids'], np.arange(3))
+        
+        del arrays
+        reader.close()
+        publisher.close()
+
+class TestVectorStoreSharedIndex(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'health.db')
+        self.name = f"test-store-{uuid.uuid4().hex[:12]}"
+    
+    def tearDown(self):
+        unlink_shared_index(self.name)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_workers_attach_instead_of_loading(self):
+        """Test that a second store attaches the published index and follows later rebuilds"""
+        builder = VectorStore(db_path=self.db_path, shared_index=self.name)
+        builder.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        self.assertEqual(builder.shared_index.version, 1)
+        self.assertFalse(builder.tfidf_index.doc_ids.flags.writeable)
+        
+        with patch.object(VectorStore, '_load_index') as load_index:
+            worker = VectorStore(db_path=self.db_path, shared_index=self.name)
+            load_index.assert_not_called()
+        
+        self.assertEqual(worker.search_documents("diabetes")[0]['filename'], "doc1.txt")
+        
+        # A rebuild by the builder reaches the worker on its next search, without a refit
+        builder.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        with patch.object(worker, '_update_vectorizer') as update_vectorizer:
+            self.assertEqual(worker.search_documents("cholesterol")[0]['filename'], "doc2.txt")
+            update_vectorizer.assert_not_called()
+        self.assertEqual(worker.shared_index.version, 2)
+        
+        worker.close()
+        builder.close()
+    
+    def test_cached_results_follow_shared_versions(self):
+        """Test that a store does not serve results cached before another store published a write"""
+        writer = VectorStore(db_path=self.db_path, shared_index=self.name)
+        writer.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        reader = VectorStore(db_path=self.db_path, shared_index=self.name)
+        self.assertEqual(reader.search_documents("insulin pump therapy"), [])
+        
+        writer.add_document("doc2.txt", "Insulin pump therapy delivers insulin through the day.", "Medical")
+        self.assertEqual([doc['filename'] for doc in reader.search_documents("insulin pump therapy")], ["doc2.txt"])
+        
+        reader.close()
+        writer.close()
+    
+    def test_deletes_reach_other_processes(self):
+        """Test that a worker process stops returning a document another process deleted"""
+        builder = VectorStore(db_path=self.db_path, shared_index=self.name)
+        first_id = builder.add_document("doc1.txt", "Information about cholesterol and heart health.", "Medical")
+        second_id = builder.add_document("doc2.txt", "Cholesterol panel with LDL and HDL values.", "Lab Results")
+        
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(1, initializer=_open_worker_store, initargs=(self.db_path, self.name)) as pool:
+            self.assertEqual(sorted(pool.apply(_search_worker_store, ("cholesterol",))), [first_id, second_id])
+            
+            builder.delete_document(first_id)
+            self.assertEqual(pool.apply(_search_worker_store, ("cholesterol",)), [second_id])
+        
+        reopened = VectorStore(db_path=self.db_path, shared_index=self.name)
+        self.assertEqual([doc['id'] for doc in reopened.search_documents("cholesterol")], [second_id])
+        reopened.close()
+        builder.close()
+    
+    def test_worker_process_attaches(self):
+        """Test that a separate process attaches the shared index"""
+        builder = VectorStore(db_path=self.db_path, shared_index=self.name)
+        builder.add_document("doc1.txt", "Information about cholesterol and heart health.", "Medical")
+        
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(1) as pool:
+            version, filenames = pool.apply(_search_in_worker, (self.db_path, self.name, "cholesterol"))
+        
+        self.assertEqual(version, builder.shared_index.version)
+        self.assertEqual(filenames, ["doc1.txt"])
+        builder.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from snippets import highlight
+
+class TestHighlight(unittest.TestCase):
+    
+    def test_marks_terms_in_window(self):
+        """Test that the window surrounds the first match and marks whole-word matches only"""
+        text = " ".join(f"word{i}" for i in range(100)) + " Started Metformin for diabetes, metformins excluded. " + \
+               " ".join(f"tail{i}" for i in range(100))
+        snippet = highlight(text, {"metformin", "diabetes"}, width=80)
+        
+        self.assertTrue(snippet.startswith("... ") and snippet.endswith(" ..."))
+        self.assertLessEqual(len(snippet), 80 + 8)
+        self.assertIn("Started **Metformin** for **diabetes**, metformins", snippet)
+        
+        # Cuts fall between words
+        self.assertLessEqual(set(snippet.replace("**", "").split()) - {"..."}, set(text.split()))
+    
+    def test_short_text_and_no_match(self):
+        """Test that short text is kept whole and text without matches starts at the beginning"""
+        self.assertEqual(highlight("Glucose  95\nmg/dL", {"glucose"}), "**Glucose** 95 mg/dL")
+        self.assertEqual(highlight("one two three four", {"absent"}, width=9), "one two ...")
+        self.assertEqual(highlight("one two", set()), "one two")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import json
+import numpy as np
+from scipy import sparse
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from vector_codec import PRECISIONS, encode_rows, decode_rows
+
+class TestVectorCodec(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        matrix = sparse.random(20, 2 ** 18, density=0.0005, random_state=1, format='csr')
+        matrix.data = rng.random(matrix.nnz)
+        self.matrix = matrix
+    
+    def test_round_trip(self):
+        """Test that every precision restores the rows within its rounding error, in less space than JSON"""
+        tolerances = {'float32': 1e-7, 'float16': 1e-3, 'int8': 1 / 127}
+        legacy = sum(len(json.dumps({'indices': row.indices.tolist(), 'weights': row.data.tolist()}))
+                     for row in self.matrix)
+        
+        for precision in PRECISIONS:
+            with self.subTest(precision=precision):
+                encoded = encode_rows(self.matrix, precision)
+                self.assertTrue(all(isinstance(value, bytes) for value in encoded))
+                self.assertLess(sum(map(len, encoded)), legacy / 2)
+                
+                decoded = decode_rows(encoded, self.matrix.shape[1])
+                np.testing.assert_array_equal(decoded.indices, self.matrix.indices)
+                np.testing.assert_array_equal(decoded.indptr, self.matrix.indptr)
+                np.testing.assert_allclose(decoded.data, self.matrix.data, atol=tolerances[precision])
+    
+    def test_index_width(self):
+        """Test that indices take two bytes when every one fits"""
+        narrow = sparse.csr_matrix(([0.5, 0.25], [3, 999], [0, 2]), shape=(1, 1000))
+        wide = sparse.csr_matrix(([0.5, 0.25], [3, 70000], [0, 2]), shape=(1, 2 ** 18))
+        
+        self.assertEqual(len(encode_rows(narrow, 'float16')[0]), 2 + 2 * (2 + 2))
+        self.assertEqual(len(encode_rows(wide, 'float16')[0]), 2 + 2 * (4 + 2))
+        self.assertEqual(decode_rows(encode_rows(wide, 'int8'), 2 ** 18).indices.tolist(), [3, 70000])
+    
+    def test_empty_rows(self):
+        """Test empty rows and empty matrices"""
+        empty = encode_rows(sparse.csr_matrix((1, 10)), 'int8')[0]
+        
+        np.testing.assert_array_equal(decode_rows([empty], 10).toarray()[0], np.zeros(10))
+        self.assertEqual(decode_rows([], 10).shape, (0, 10))
+
+if __name__ == '__main__':
+    unittest.main()
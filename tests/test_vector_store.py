@@ -2,11 +2,17 @@ import unittest
 import tempfile
 import os
 import sys
+import shutil
+import threading
+import numpy as np
+from datetime import datetime
+from unittest.mock import patch
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from vector_store import VectorStore
+from index_snapshot import ARRAYS, save_snapshot, load_snapshot
 
 class TestVectorStore(unittest.TestCase):
     
@@ -17,8 +23,12 @@ class TestVectorStore(unittest.TestCase):
         self.store = VectorStore(db_path=self.temp_db.name)
     
     def tearDown(self):
-        # Cleanup temporary database
-        os.unlink(self.temp_db.name)
+        # Cleanup temporary database, WAL files and index snapshot
+        self.store.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.temp_db.name + suffix):
+                os.unlink(self.temp_db.name + suffix)
+        shutil.rmtree(self.temp_db.name + '.index', ignore_errors=True)
     
     def test_add_and_retrieve_document(self):
         """Test adding and retrieving documents"""
@@ -48,7 +58,11 @@ class TestVectorStore(unittest.TestCase):
         results = self.store.search_documents("diabetes blood sugar")
         
         self.assertGreater(len(results), 0)
-        self.assertIn("diabetes", results[0]['content'].lower())
+        self.assertEqual(results[0]['filename'], "doc1.txt")
+        self.assertIn("**diabetes**", results[0]['snippet'])
+        
+        # Hits are compact; the full content is loaded through get_document
+        self.assertEqual(set(results[0]), {'id', 'filename', 'document_type', 'similarity', 'snippet'})
     
     def test_document_stats(self):
         """Test document statistics"""
@@ -61,4 +75,658 @@ class TestVectorStore(unittest.TestCase):
         
         self.assertEqual(stats['total_documents'], 3)
         self.assertEqual(stats['documents_by_type']['Type A'], 2)
-        self.assertEqual(stats['documents_by_type']['Type B'], 1)
\ No newline at end of file
+        self.assertEqual(stats['documents_by_type']['Type B'], 1)    
+    
+    def test_document_stats_maintained_by_triggers(self):
+        """Test that the stats table follows inserts, deletes and type changes"""
+        doc_id = self.store.add_document("doc1.txt", "Content 1", "Type A")
+        self.store.add_documents([
+            {'filename': "doc2.txt", 'content': "Content 2", 'document_type': "Type A"},
+            {'filename': "doc3.txt", 'content': "Content 3"}
+        ])
+        self.store.delete_document(doc_id)
+        with self.store.connections.get() as conn:
+            conn.execute("UPDATE documents SET document_type = 'Type B' WHERE filename = 'doc2.txt'")
+        
+        stats = self.store.get_document_stats()
+        self.assertEqual(stats['total_documents'], 2)
+        self.assertEqual(stats['documents_by_type'], {'Type B': 1, None: 1})
+        
+        # A store created before the stats table is counted once on open
+        with self.store.connections.get() as conn:
+            for trigger in ('document_stats_insert', 'document_stats_delete', 'document_stats_update'):
+                conn.execute(f'DROP TRIGGER {trigger}')
+            conn.execute('DROP TABLE document_stats')
+        
+        reopened = VectorStore(db_path=self.temp_db.name)
+        self.assertEqual(reopened.get_document_stats()['documents_by_type'], {'Type B': 1, None: 1})
+        reopened.close()
+    
+    def test_index_persisted_between_instances(self):
+        """Test that a reopened store loads the fitted index instead of refitting"""
+        self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        self.store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        
+        expected = self.store.search_documents("cholesterol heart")
+        
+        with patch.object(VectorStore, '_update_vectorizer') as update_vectorizer:
+            reopened = VectorStore(db_path=self.temp_db.name)
+            update_vectorizer.assert_not_called()
+        
+        results = reopened.search_documents("cholesterol heart")
+        
+        self.assertEqual([doc['id'] for doc in results], [doc['id'] for doc in expected])
+        self.assertAlmostEqual(results[0]['similarity'], expected[0]['similarity'])
+    
+    def test_search_excludes_deleted_documents(self):
+        """Test that deleted documents drop out of the index"""
+        doc_id = self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        self.store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        
+        self.store.delete_document(doc_id)
+        
+        self.assertEqual(self.store.search_documents("diabetes blood sugar"), [])
+    
+    def test_bm25_scorer(self):
+        """Test searching with the incrementally maintained BM25 scorer"""
+        store = VectorStore(db_path=self.temp_db.name, scorer='bm25')
+        
+        with patch.object(store, '_update_vectorizer') as update_vectorizer:
+            doc_id = store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+            store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+            update_vectorizer.assert_not_called()
+        
+        # Without the neighbour graph, ingest does no hashing beyond the scorer's own work
+        self.assertEqual(store.connections.get().execute('SELECT COUNT(*) FROM hashed_vectors').fetchone()[0], 0)
+        
+        results = store.search_documents("diabetes blood sugar")
+        self.assertEqual(results[0]['id'], doc_id)
+        
+        store.delete_document(doc_id)
+        self.assertEqual(store.search_documents("diabetes blood sugar"), [])
+    
+    def test_fts5_scorer(self):
+        """Test searching through the trigger-maintained FTS5 index"""
+        # Documents stored before full-text search was enabled are picked up
+        doc_id = self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        
+        store = VectorStore(db_path=self.temp_db.name, scorer='fts5')
+        other_id = store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        
+        results = store.search_documents("diabetes blood sugar")
+        self.assertEqual([doc['id'] for doc in results], [doc_id])
+        self.assertGreater(results[0]['similarity'], 0)
+        
+        # FTS5 query syntax in user input is treated as plain text
+        results = store.search_documents('cholesterol "OR* heart')
+        self.assertEqual([doc['id'] for doc in results], [other_id])
+        
+        store.delete_document(doc_id)
+        self.assertEqual(store.search_documents("diabetes"), [])
+    
+    def test_hashing_scorer(self):
+        """Test the fit-free hashing scorer with LSH candidate search"""
+        # Documents stored before hashing was enabled are vectorized on open
+        doc_id = self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        
+        store = VectorStore(db_path=self.temp_db.name, scorer='hashing')
+        with patch.object(store, '_update_vectorizer') as update_vectorizer:
+            other_ids = store.add_documents([
+                {'filename': "doc2.txt", 'content': "Information about cholesterol and heart health.", 'document_type': "Medical"}
+            ])['ids']
+            update_vectorizer.assert_not_called()
+        
+        self.assertEqual(store.search_documents("diabetes blood sugar")[0]['id'], doc_id)
+        self.assertEqual(store.search_documents("cholesterol heart")[0]['id'], other_ids[0])
+        
+        # Stored vectors are reused rather than recomputed when reopening
+        reopened = VectorStore(db_path=self.temp_db.name, scorer='hashing')
+        with patch.object(reopened.hashing_vectorizer, 'transform', wraps=reopened.hashing_vectorizer.transform) as transform:
+            reopened._build_lsh_index()
+            transform.assert_not_called()
+        self.assertEqual(len(reopened.lsh_index), 2)
+        
+        store.delete_document(doc_id)
+        self.assertEqual(store.search_documents("diabetes blood sugar"), [])
+    
+    def test_quantized_vectors(self):
+        """Test that hashed vectors are stored as quantized BLOBs and TF-IDF rows as float32 BLOBs"""
+        doc_id = self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.",
+                                         "Medical")
+        with self.store.connections.get() as conn:
+            stored = conn.execute('SELECT vector_data FROM document_vectors').fetchone()[0]
+            self.assertIsInstance(stored, bytes)
+            self.assertEqual(stored[:1], b'f')
+        
+        store = VectorStore(db_path=self.temp_db.name, scorer='hashing', vector_precision='int8')
+        other_id = store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        self.assertEqual(store.lsh_index.vectors[doc_id][1].dtype, np.float16)
+        
+        stored = store.connections.get().execute('''
+            SELECT vector_data FROM hashed_vectors WHERE kind = 'document' AND item_id = ?
+        ''', (other_id,)).fetchone()[0]
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(stored[:1], b'b')
+        
+        hit = store.search_documents("cholesterol heart")[0]
+        self.assertEqual(hit['id'], other_id)
+        self.assertGreater(hit['similarity'], 0.1)
+        store.close()
+    
+    def test_compressed_content(self):
+        """Test that compressed rows read back transparently next to plain ones"""
+        filler = " ".join(f"word{i}" for i in range(300))
+        long_content = f"{filler} The patient was discharged on metformin for diabetes. {filler}"
+        plain_id = self.store.add_document("plain.txt", "Information about cholesterol and heart health.", "Medical")
+        
+        for scorer in ('tfidf', 'bm25', 'fts5', 'hashing'):
+            with self.subTest(scorer=scorer):
+                store = VectorStore(db_path=self.temp_db.name, scorer=scorer, compression='zlib', passage_words=40,
+                                    passage_overlap=10)
+                short_content = "Prescription refill for lisinopril and blood pressure monitoring."
+                doc_id, short_id = store.add_documents([
+                    {'filename': f"{scorer}.txt", 'content': long_content, 'document_type': "Discharge Summary"},
+                    {'filename': f"{scorer}_short.txt", 'content': short_content, 'document_type': "Prescription"}
+                ])['ids']
+                
+                raw, codec = store.connections.get().execute(
+                    'SELECT content, content_codec FROM documents WHERE id = ?', (doc_id,)
+                ).fetchone()
+                self.assertEqual(codec, 'zlib')
+                self.assertIsInstance(raw, bytes)
+                
+                self.assertEqual(store.get_document(doc_id)['content'], long_content)
+                hit = store.search_documents("lisinopril blood pressure")[0]
+                self.assertEqual(store.get_document(hit['id'])['content'], short_content)
+                self.assertIn("metformin", store.search_passages("metformin diabetes")[0]['text'])
+                self.assertEqual(store.search_documents("cholesterol heart")[0]['id'], plain_id)
+                
+                previews = {doc['id']: doc['preview'] for doc in store.iter_documents(columns=['filename'],
+                                                                                       preview_chars=10)}
+                self.assertEqual(previews[doc_id], long_content[:10])
+                
+                store.delete_document(doc_id)
+                store.delete_document(short_id)
+                self.assertEqual(store.search_passages("metformin diabetes"), [])
+                self.assertEqual(store.search_documents("lisinopril blood pressure"), [])
+                store.close()
+    
+    def test_search_filters(self):
+        """Test that type, date and metadata filters select documents before scoring"""
+        for scorer in ('tfidf', 'bm25', 'fts5', 'hashing'):
+            with self.subTest(scorer=scorer):
+                store = VectorStore(db_path=self.temp_db.name, scorer=scorer)
+                old_id, new_id, other_id = store.add_documents([
+                    {'filename': "old.txt", 'content': "Glucose and diabetes lab report.", 'document_type': "Lab Report",
+                     'metadata': {'provider': "Dr. Smith"}},
+                    {'filename': "new.txt", 'content': "Glucose and diabetes follow-up report.", 'document_type': "Lab Report",
+                     'metadata': {'provider': "Dr. Jones"}},
+                    {'filename': "note.txt", 'content': "Glucose and diabetes visit notes.", 'document_type': "Visit Notes"}
+                ])['ids']
+                with store.connections.get() as conn:
+                    conn.execute("UPDATE documents SET timestamp = '2020-01-01 00:00:00' WHERE id = ?", (old_id,))
+                store.result_cache.clear()
+                
+                def ids(**filters):
+                    return sorted(doc['id'] for doc in store.search_documents("glucose diabetes", **filters))
+                
+                self.assertEqual(ids(), sorted([old_id, new_id, other_id]))
+                self.assertEqual(ids(document_type="Lab Report"), sorted([old_id, new_id]))
+                self.assertEqual(ids(document_type="Lab Report", since=datetime(2021, 1, 1)), [new_id])
+                self.assertEqual(ids(until="2021-01-01"), [old_id])
+                self.assertEqual(ids(metadata={'provider': "Dr. Smith"}), [old_id])
+                self.assertEqual(ids(document_type="Prescription"), [])
+                
+                passages = store.search_passages("glucose diabetes", document_type="Visit Notes")
+                self.assertEqual({passage['document_id'] for passage in passages}, {other_id})
+                
+                for doc_id in (old_id, new_id, other_id):
+                    store.delete_document(doc_id)
+                store.close()
+    
+    def test_delete_tombstones_until_compaction(self):
+        """Test that deletes hide documents at once and compaction refits in the background"""
+        store = VectorStore(db_path=self.temp_db.name, compaction_threshold=0.3)
+        ids = store.add_documents([
+            {'filename': f"doc{i}.txt", 'content': f"Glucose and diabetes lab report number {i}."} for i in range(5)
+        ])['ids']
+        
+        with patch.object(store, '_schedule_compaction') as schedule, \
+                patch.object(store, '_update_vectorizer') as update_vectorizer:
+            store.delete_document(ids[0])
+            update_vectorizer.assert_not_called()
+            schedule.assert_not_called()
+        
+        self.assertEqual(store.tfidf_index.tombstones, {ids[0]})
+        self.assertEqual(len(store.tfidf_index.doc_ids), 5)
+        self.assertEqual(store.tfidf_index.doc_live.tolist(), [False, True, True, True, True])
+        self.assertEqual(store.tfidf_index.passage_live.tolist(),
+                         (store.tfidf_index.passage_document_ids != ids[0]).tolist())
+        
+        # An id the index does not hold neither grows the tombstones nor counts towards compaction
+        snapshot = store.tfidf_index
+        with patch.object(store, '_schedule_compaction') as schedule:
+            store.delete_document(max(ids) + 100)
+            schedule.assert_not_called()
+        self.assertIs(store.tfidf_index, snapshot)
+        
+        self.assertNotIn(ids[0], [doc['id'] for doc in store.search_documents("glucose diabetes")])
+        self.assertNotIn(ids[0], [doc['id'] for doc in store.search_many(["glucose diabetes"])[0]])
+        self.assertNotIn(ids[0], [passage['document_id'] for passage in store.search_passages("glucose diabetes")])
+        
+        # Crossing the tombstone ratio compacts the index off the request path
+        store.delete_document(ids[1])
+        store._compaction_thread.join()
+        
+        self.assertEqual(store.tfidf_index.tombstones, set())
+        self.assertIsNone(store.tfidf_index.doc_live)
+        self.assertEqual(list(store.tfidf_index.doc_ids), ids[2:])
+        self.assertEqual(sorted(doc['id'] for doc in store.search_documents("glucose diabetes")), ids[2:])
+        store.close()
+    
+    def test_search_hits_carry_snippets(self):
+        """Test that hits carry a bounded snippet cut from the matching passage of a long document"""
+        filler = " ".join(f"word{i}" for i in range(30))
+        long_content = f"{filler} The patient was discharged on metformin for diabetes. {filler}"
+        
+        for scorer in ('tfidf', 'bm25', 'fts5', 'hashing'):
+            with self.subTest(scorer=scorer):
+                store = VectorStore(db_path=self.temp_db.name, scorer=scorer, passage_words=40, passage_overlap=10,
+                                    duplicates='off')
+                store.add_document(f"{scorer}_summary.txt", long_content, "Discharge Summary")
+                store.add_document(f"{scorer}_other.txt", "Information about cholesterol and heart health.", "Medical")
+                
+                hit = store.search_documents("metformin diabetes")[0]
+                self.assertIn("discharged on **metformin** for **diabetes**", hit['snippet'])
+                self.assertLessEqual(len(hit['snippet'].replace("**", "")), VectorStore.SNIPPET_CHARS + 8)
+                self.assertNotIn('content', hit)
+                self.assertEqual(store.search_many(["metformin diabetes"])[0][0]['snippet'], hit['snippet'])
+                store.close()
+    
+    def test_similar_documents(self):
+        """Test that the neighbour graph follows ingest and delete and is read without scoring"""
+        self.store.close()
+        self.store = VectorStore(db_path=self.temp_db.name, neighbors=10)
+        first = self.store.add_document("a1c_march.txt", "HbA1c 7.2 percent, diabetes management with metformin.", "Lab Results")
+        second = self.store.add_document("a1c_june.txt", "HbA1c 6.8 percent, diabetes improving on metformin.", "Lab Results")
+        other, third = self.store.add_documents([
+            {'filename': "lipids.txt", 'content': "Total cholesterol 185, LDL 110, heart health stable."},
+            {'filename': "a1c_sept.txt", 'content': "HbA1c 6.5 percent, diabetes controlled, continue metformin."}
+        ])['ids']
+        
+        with patch('vector_store.LSHIndex.query') as query:
+            similar = self.store.similar_documents(first)
+            query.assert_not_called()
+        
+        self.assertEqual({doc['id'] for doc in similar[:2]}, {second, third})
+        self.assertNotIn(other, [doc['id'] for doc in similar])
+        self.assertEqual(set(similar[0]), {'id', 'filename', 'document_type', 'similarity'})
+        self.assertEqual(len(self.store.similar_documents(first, k=1)), 1)
+        
+        self.store.delete_document(second)
+        self.assertEqual([doc['id'] for doc in self.store.similar_documents(first)], [third])
+        self.assertEqual(self.store.similar_documents(second), [])
+        
+        # A store without the graph leaves it stale, and the next store with it relinks
+        store = VectorStore(db_path=self.temp_db.name, neighbors=0)
+        fourth = store.add_document("a1c_dec.txt", "HbA1c 6.4 percent, diabetes controlled on metformin.", "Lab Results")
+        store.close()
+        
+        store = VectorStore(db_path=self.temp_db.name, scorer='hashing', neighbors=1)
+        self.assertEqual(len(store.similar_documents(fourth)), 1)
+        self.assertIn(store.similar_documents(fourth)[0]['id'], (first, third))
+        store.close()
+    
+    def test_neighbor_vectors_load_without_blocking_searches(self):
+        """Test that loading the private neighbour tables never takes the search lock"""
+        self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        store = VectorStore(db_path=self.temp_db.name, scorer='bm25', neighbors=5)
+        store.neighbor_index = None
+        
+        with patch.object(store.index_lock, 'write') as write:
+            self.assertEqual(len(store._neighbor_vectors()), 1)
+            write.assert_not_called()
+        store.close()
+    
+    def test_neighbor_graph_kept_across_reopen(self):
+        """Test that a TF-IDF refit keeps the graph marker, so reopening does not relink the graph"""
+        store = VectorStore(db_path=self.temp_db.name, neighbors=5)
+        first = store.add_document("a1c_march.txt", "HbA1c 7.2 percent, diabetes management with metformin.")
+        second = store.add_document("a1c_june.txt", "HbA1c 6.8 percent, diabetes improving on metformin.")
+        store.close()
+        
+        with patch.object(VectorStore, '_link_documents') as link_documents:
+            reopened = VectorStore(db_path=self.temp_db.name, neighbors=5)
+            link_documents.assert_not_called()
+        
+        self.assertEqual([doc['id'] for doc in reopened.similar_documents(first)], [second])
+        reopened.close()
+    
+    def test_near_duplicates_flagged_or_skipped(self):
+        """Test that ingest flags near-duplicates, or skips them with duplicates='skip'"""
+        report = ("LABORATORY RESULTS: Glucose: 95 mg/dL (Normal: 70-99). Total Cholesterol: 185 mg/dL. "
+                  "HDL Cholesterol: 45 mg/dL. Continue metformin 500mg twice daily.")
+        rescan = report.replace("Glucose", "GIucose")
+        
+        original_id = self.store.add_document("report.pdf", report, "Lab Results")
+        flagged_id = self.store.add_document("report-rescan.pdf", rescan, "Lab Results")
+        self.assertNotEqual(flagged_id, original_id)
+        self.assertEqual(self.store.get_document(flagged_id)['duplicate_of'], original_id)
+        self.assertIsNone(self.store.get_document(original_id)['duplicate_of'])
+        
+        # Signatures persist, so a reopened store still knows the stored documents
+        store = VectorStore(db_path=self.temp_db.name, duplicates='skip')
+        self.assertEqual(store.add_document("report-copy.pdf", report.upper()), original_id)
+        
+        imported = store.add_documents([
+            {'filename': "prescription.txt", 'content': "Prescription for lisinopril 10mg once daily."},
+            {'filename': "report-again.pdf", 'content': rescan},
+            {'filename': "prescription-copy.txt", 'content': "Prescription for lisinopril 10mg once daily!"}
+        ])
+        self.assertEqual(imported['ids'][1:], [flagged_id, imported['ids'][0]])
+        self.assertEqual(imported['duplicates'], {1: flagged_id, 2: imported['ids'][0]})
+        self.assertEqual(store.get_document_stats()['total_documents'], 3)
+        
+        # Deleting the original clears the flag on its duplicate
+        store.delete_document(original_id)
+        self.assertIsNone(store.get_document(flagged_id)['duplicate_of'])
+        store.close()
+    
+    def test_delete_during_compaction_not_saved_as_fitted(self):
+        """Test that a delete committed while compaction fits leaves the saved index stale"""
+        ids = self.store.add_documents([
+            {'filename': f"doc{i}.txt", 'content': f"Glucose and diabetes lab report number {i}."} for i in range(5)
+        ])['ids']
+        
+        writer = VectorStore(db_path=self.temp_db.name, scorer='fts5')
+        build_index = self.store._build_index
+        
+        def delete_while_fitting(*args, **kwargs):
+            writer.delete_document(ids[0])
+            return build_index(*args, **kwargs)
+        
+        with patch.object(self.store, '_build_index', side_effect=delete_while_fitting):
+            self.store.compact()
+        writer.close()
+        
+        reopened = VectorStore(db_path=self.temp_db.name)
+        self.assertEqual(list(reopened.tfidf_index.doc_ids), ids[1:])
+        reopened.close()
+    
+    def test_all_duplicate_batch_skipped(self):
+        """Test that a batch made only of skipped near-duplicates does not abort the import"""
+        report = "Glucose: 95 mg/dL. Continue metformin 500mg twice daily."
+        for scorer, neighbors in (('hashing', 0), ('tfidf', 5)):
+            with self.subTest(scorer=scorer):
+                temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+                temp_db.close()
+                store = VectorStore(db_path=temp_db.name, scorer=scorer, duplicates='skip', neighbors=neighbors)
+                try:
+                    ids = store.add_documents([
+                        {'filename': "report.pdf", 'content': report},
+                        {'filename': "report-copy.pdf", 'content': report}
+                    ], batch_size=1)['ids']
+                    self.assertEqual(len(ids), 2)
+                    self.assertEqual(ids[1], ids[0])
+                    self.assertEqual(store.get_document_stats()['total_documents'], 1)
+                finally:
+                    store.close()
+                    os.unlink(temp_db.name)
+    
+    def test_index_snapshots_published_atomically(self):
+        """Test that writers publish new index snapshots and readers never wait for a refit"""
+        first_id = self.store.add_document("doc1.txt", "Glucose and diabetes lab report.", "Lab Results")
+        snapshot = self.store.tfidf_index
+        
+        # Writes publish new snapshots and leave the one a query already holds untouched
+        second_id = self.store.add_document("doc2.txt", "Glucose tolerance test for diabetes.", "Lab Results")
+        self.assertIsNot(self.store.tfidf_index, snapshot)
+        self.assertEqual(list(snapshot.doc_ids), [first_id])
+        
+        self.store.delete_document(first_id)
+        self.assertEqual(snapshot.tombstones, frozenset())
+        self.assertIsNone(snapshot.doc_live)
+        with self.assertRaises(AttributeError):
+            snapshot.doc_ids = np.zeros(0, dtype=np.int64)
+        
+        # A refit holding the refit lock does not block searches
+        results = []
+        with self.store._refit_lock:
+            reader = threading.Thread(target=lambda: results.extend(self.store.search_documents("glucose")))
+            reader.start()
+            reader.join(timeout=5)
+            self.assertFalse(reader.is_alive())
+        
+        self.assertEqual([doc['id'] for doc in results], [second_id])
+    
+    def test_search_many_matches_single_queries(self):
+        """Test that batched search returns the same rankings as one query at a time"""
+        self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        self.store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        self.store.add_document("doc3.txt", "Prescription for blood pressure medication.", "Prescription")
+        
+        queries = ["diabetes blood sugar", "heart cholesterol", "blood pressure", "unrelated words"]
+        batched = self.store.search_many(queries, top_k=2)
+        
+        self.assertEqual(len(batched), len(queries))
+        for query, results in zip(queries, batched):
+            expected = self.store.search_documents(query, top_k=2)
+            self.assertEqual([doc['id'] for doc in results], [doc['id'] for doc in expected])
+            for doc, expected_doc in zip(results, expected):
+                self.assertAlmostEqual(doc['similarity'], expected_doc['similarity'])
+    
+    def test_index_snapshot_memory_mapped(self):
+        """Test that startup memory-maps a fresh snapshot and rebuilds a stale one"""
+        self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        self.store.add_document("doc2.txt", "Information about cholesterol and heart health.", "Medical")
+        
+        with patch.object(VectorStore, '_update_vectorizer') as update_vectorizer:
+            reopened = VectorStore(db_path=self.temp_db.name)
+            update_vectorizer.assert_not_called()
+        
+        self.assertIsInstance(reopened.tfidf_index.doc_ids, np.memmap)
+        self.assertFalse(reopened.tfidf_index.doc_matrix.data.flags.writeable)
+        self.assertEqual(reopened.search_documents("cholesterol")[0]['filename'], "doc2.txt")
+        
+        # A document added behind the snapshot's back makes it stale
+        doc_id = self.store.add_document("doc3.txt", "Prescription for blood pressure medication.", "Prescription")
+        VectorStore(db_path=self.temp_db.name, scorer='fts5').add_document("doc4.txt", "Lisinopril refill.", "Prescription")
+        
+        with patch.object(VectorStore, '_update_vectorizer', autospec=True,
+                          side_effect=VectorStore._update_vectorizer) as update_vectorizer:
+            rebuilt = VectorStore(db_path=self.temp_db.name)
+            update_vectorizer.assert_called_once()
+        
+        self.assertEqual(rebuilt.search_documents("blood pressure medication")[0]['id'], doc_id)
+        self.assertIn("doc4.txt", [doc['filename'] for doc in rebuilt.search_documents("lisinopril refill")])
+    
+    def test_index_rebuilt_from_rows_without_snapshot(self):
+        """Test that a missing snapshot is rebuilt from stored rows without float16 rounding"""
+        for i in range(5):
+            self.store.add_document(f"doc{i}.txt", f"Glucose {i} mg/dL, cholesterol and heart health note {i}.")
+        fitted = self.store.tfidf_index.doc_matrix.toarray()
+        
+        shutil.rmtree(self.store.snapshot_dir)
+        with patch.object(VectorStore, '_update_vectorizer') as update_vectorizer:
+            reopened = VectorStore(db_path=self.temp_db.name)
+            update_vectorizer.assert_not_called()
+        
+        np.testing.assert_allclose(reopened.tfidf_index.doc_matrix.toarray(), fitted, rtol=1e-6)
+        reopened.close()
+    
+    def test_snapshot_cleanup_spares_other_writers(self):
+        """Test that publishing a snapshot only removes complete, older ones"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        arrays = {key: np.zeros(0) for key in ARRAYS}
+        
+        save_snapshot(directory, 'old', {}, arrays)
+        old = [entry for entry in os.listdir(directory) if entry.startswith('snapshot-')]
+        
+        # Another writer is still filling in an older snapshot
+        in_progress = f"snapshot-{1:020d}-pending"
+        os.makedirs(os.path.join(directory, in_progress))
+        
+        save_snapshot(directory, 'new', {}, arrays)
+        entries = set(os.listdir(directory))
+        self.assertIn(in_progress, entries)
+        self.assertFalse(entries & set(old))
+        self.assertIsNotNone(load_snapshot(directory, 'new'))
+        
+        # A writer that started before the current snapshot does not replace it
+        with patch('index_snapshot.time.time_ns', return_value=2):
+            save_snapshot(directory, 'stale', {}, arrays)
+        self.assertIsNotNone(load_snapshot(directory, 'new'))
+        self.assertEqual(set(os.listdir(directory)), entries)
+    
+    def test_connections_reused_per_thread(self):
+        """Test that each thread reuses one tuned WAL connection"""
+        conn = self.store.connections.get()
+        self.assertIs(self.store.connections.get(), conn)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        
+        doc_id = self.store.add_document("doc1.txt", "Content 1", "Type A")
+        self.assertEqual(self.store.get_document(doc_id)['filename'], "doc1.txt")
+        self.assertIs(self.store.connections.get(), conn)
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.store.connections.get()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+    
+    def test_add_documents_bulk(self):
+        """Test bulk ingestion with a single deferred index update"""
+        documents = [
+            {'filename': f"doc{i}.txt", 'content': f"Lab report {i} glucose panel", 'document_type': "Lab Report"}
+            for i in range(25)
+        ]
+        documents[7]['content'] = "Prescription for blood pressure medication."
+        
+        with patch.object(VectorStore, '_update_vectorizer', autospec=True,
+                          side_effect=VectorStore._update_vectorizer) as update_vectorizer:
+            report = self.store.add_documents(documents, batch_size=10)
+            update_vectorizer.assert_called_once()
+        
+        self.assertEqual(len(report['ids']), 25)
+        self.assertEqual([batch['documents'] for batch in report['batches']], [10, 10, 5])
+        self.assertEqual(self.store.get_document(report['ids'][3])['filename'], "doc3.txt")
+        self.assertEqual(self.store.search_documents("blood pressure")[0]['id'], report['ids'][7])
+    
+    def test_add_documents_rolls_back_on_error(self):
+        """Test that a failed bulk import leaves no partial data behind"""
+        documents = [{'filename': "doc1.txt", 'content': "Content 1"}, {'filename': "doc2.txt", 'content': None}]
+        
+        report = self.store.add_documents(documents, batch_size=1)
+        
+        self.assertEqual(report['ids'], [])
+        self.assertEqual(self.store.list_documents(), [])
+    
+    def test_add_documents_batch_reindex(self):
+        """Test reindexing after every committed batch"""
+        store = VectorStore(db_path=self.temp_db.name, scorer='bm25')
+        documents = ({'filename': f"doc{i}.txt", 'content': f"Cholesterol result {i}"} for i in range(5))
+        
+        report = store.add_documents(documents, batch_size=2, reindex='batch')
+        
+        self.assertEqual(len(report['batches']), 3)
+        self.assertTrue(all('index_seconds' in batch for batch in report['batches']))
+        self.assertEqual(len(store.search_documents("cholesterol", top_k=10)), 5)
+    
+    def test_iter_documents_paginated_projection(self):
+        """Test keyset pagination with column projection and SQL previews"""
+        report = self.store.add_documents(
+            {'filename': f"doc{i}.txt", 'content': f"Document number {i} " + "x" * 500, 'metadata': {'n': i}}
+            for i in range(7)
+        )
+        
+        pages = []
+        after = None
+        while True:
+            page = list(self.store.iter_documents(columns=['filename'], preview_chars=20, after=after, limit=3))
+            if not page:
+                break
+            pages.append(page)
+            after = (page[-1]['timestamp'], page[-1]['id'])
+        
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        documents = [doc for page in pages for doc in page]
+        self.assertEqual([doc['id'] for doc in documents], sorted(report['ids'], reverse=True))
+        self.assertEqual(set(documents[0]), {'id', 'timestamp', 'filename', 'preview'})
+        self.assertEqual(documents[-1]['preview'], "Document number 0 xx")
+        
+        with self.assertRaises(ValueError):
+            self.store.iter_documents(columns=['content; DROP TABLE documents'])
+    
+    def test_split_passages_overlap(self):
+        """Test that passages are overlapping word windows covering the content"""
+        store = VectorStore(db_path=self.temp_db.name, passage_words=4, passage_overlap=1)
+        content = "one two three four five six seven eight nine ten"
+        
+        passages = [content[start:end] for start, end in store._split_passages(content)]
+        
+        self.assertEqual(passages, ["one two three four", "four five six seven", "seven eight nine ten"])
+    
+    def test_search_passages(self):
+        """Test that passage search returns matching passages with their parent document"""
+        filler = " ".join(f"word{i}" for i in range(300))
+        long_content = f"{filler} The patient was discharged on metformin for diabetes. {filler}"
+        
+        for scorer in ('tfidf', 'bm25', 'fts5', 'hashing'):
+            with self.subTest(scorer=scorer):
+                store = VectorStore(db_path=self.temp_db.name, scorer=scorer, passage_words=40, passage_overlap=10)
+                doc_id = store.add_document(f"{scorer}_summary.txt", long_content, "Discharge Summary")
+                store.add_document(f"{scorer}_other.txt", "Information about cholesterol and heart health.", "Medical")
+                
+                results = store.search_passages("metformin diabetes", top_k=2)
+                
+                self.assertEqual(results[0]['document_id'], doc_id)
+                self.assertIn("metformin", results[0]['text'])
+                self.assertLess(len(results[0]['text']), len(long_content) // 3)
+                self.assertNotIn('content', results[0])
+                
+                store.delete_document(doc_id)
+                self.assertEqual(store.search_passages("metformin diabetes"), [])
+    
+    def test_passage_index_restored_from_snapshot(self):
+        """Test that the passage index is memory-mapped along with the document index"""
+        doc_id = self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        
+        reopened = VectorStore(db_path=self.temp_db.name)
+        
+        self.assertIsInstance(reopened.tfidf_index.passage_ids, np.memmap)
+        self.assertEqual(reopened.search_passages("diabetes")[0]['document_id'], doc_id)
+    
+    def test_result_cache_invalidated_by_writes(self):
+        """Test that repeated queries hit the cache until the corpus changes"""
+        self.store.add_document("doc1.txt", "This document discusses diabetes and blood sugar management.", "Medical")
+        
+        first = self.store.search_documents("Diabetes  blood sugar")
+        
+        with patch.object(self.store, '_search_tfidf') as search_tfidf:
+            second = self.store.search_documents("diabetes blood sugar")
+            search_tfidf.assert_not_called()
+        
+        self.assertEqual(second, first)
+        self.assertEqual(self.store.cache_info()['hits'], 1)
+        
+        # Mutating a returned result does not leak into the cache
+        second[0]['filename'] = "changed.txt"
+        self.assertEqual(self.store.search_documents("diabetes blood sugar")[0]['filename'], "doc1.txt")
+        
+        doc_id = self.store.add_document("doc2.txt", "Diabetes diet and blood sugar log.", "Medical")
+        results = self.store.search_documents("diabetes blood sugar")
+        
+        self.assertIn(doc_id, [doc['id'] for doc in results])
+        self.assertEqual(self.store.cache_info()['misses'], 2)
+    
+    def test_result_cache_evicts_least_recently_used(self):
+        """Test that the cache stays bounded"""
+        store = VectorStore(db_path=self.temp_db.name, cache_size=2)
+        store.add_document("doc1.txt", "Content about glucose and insulin.", "Medical")
+        
+        for query in ("glucose", "insulin", "glucose", "content"):
+            store.search_documents(query)
+        
+        info = store.cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['evictions'], info['size']), (1, 3, 1, 2))